@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Status Check Archive
+Archives status_checks into gzip-compressed NDJSON files, one per UTC day, and
+restores them. The server runs archival itself while STATUS_RETENTION_DAYS is set;
+these commands are for one-off runs and restores.
+
+Usage:
+    python backend/archive.py archive
+    python backend/archive.py restore [--since 2024-05-01] [--until 2024-06-01] [--collection status_checks_restored]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+from compression import gzip_compressor
+
+logger = logging.getLogger(__name__)
+
+# A day is archived once it ended this long ago, so late writes (e.g. a buffered batch
+# flushed just after midnight) land before its file is written
+ARCHIVE_GRACE = timedelta(hours=1)
+# Retention must leave at least this long between a day ending and its documents expiring
+MIN_RETENTION_DAYS = 2
+# Name of the TTL index earlier versions expired status checks with
+LEGACY_TTL_INDEX = "timestamp_ttl"
+
+
+class StatusArchiver:
+    """
+    Keeps status_checks bounded: each complete UTC day is streamed, one cursor batch at
+    a time, to <archive_dir>/status_checks/YYYY/MM/YYYY-MM-DD.ndjson.gz, and once a
+    whole day is older than retention_days its documents are deleted.
+
+    A day's file is written to a temporary name, fsynced and renamed into place once
+    complete, so an existing file is always a full day and is never written again.
+    Documents are only ever deleted a day at a time, by the archiver and after that
+    day's file exists, so a backlog or failing archival (e.g. a full disk) holds back
+    expiry rather than losing unarchived days. Status checks are timestamped by the
+    server, so a day past ARCHIVE_GRACE receives no more writes. Several processes may
+    archive and expire concurrently; they produce the same file and delete the same day.
+    """
+
+    def __init__(
+        self,
+        collection,
+        archive_dir: Path,
+        retention_days: Optional[float] = None,
+        batch_size: int = 1000,
+        interval_seconds: float = 3600,
+    ):
+        if retention_days is not None and retention_days < MIN_RETENTION_DAYS:
+            raise ValueError(f"STATUS_RETENTION_DAYS must be at least {MIN_RETENTION_DAYS} so days are archived before they expire")
+        self.collection = collection
+        self.archive_dir = Path(archive_dir)
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        """Drop the TTL index of earlier versions, which expired documents whether archived or not"""
+        if LEGACY_TTL_INDEX in await self.collection.index_information():
+            await self.collection.drop_index(LEGACY_TTL_INDEX)
+
+    def path_for(self, day: date) -> Path:
+        return self.archive_dir / "status_checks" / f"{day:%Y}" / f"{day:%m}" / f"{day.isoformat()}.ndjson.gz"
+
+    def archived_days(self, since: Optional[date] = None, until: Optional[date] = None) -> List[date]:
+        """Days with an archive file, optionally limited to [since, until)"""
+        days = []
+        for path in (self.archive_dir / "status_checks").glob("*/*/*.ndjson.gz"):
+            day = date.fromisoformat(path.name[:-len(".ndjson.gz")])
+            if (since is None or day >= since) and (until is None or day < until):
+                days.append(day)
+        return sorted(days)
+
+    async def archive_day(self, day: date) -> int:
+        """Write one day's status checks to its archive file; returns the number written"""
+        start = datetime.combine(day, datetime.min.time())
+        cursor = self.collection.find(
+            {"timestamp": {"$gte": start, "$lt": start + timedelta(days=1)}},
+            {"_id": 0},
+        ).sort("timestamp", 1).batch_size(self.batch_size)
+
+        path = self.path_for(day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+        # Readable with zcat or gzip.open
+        compressor = gzip_compressor()
+        count = 0
+        lines: List[bytes] = []
+        with open(partial, "wb") as archive_file:
+            async for status_check in cursor:
+                lines.append(orjson.dumps(status_check))
+                count += 1
+                if len(lines) >= self.batch_size:
+                    chunk = b"\n".join(lines) + b"\n"
+                    lines = []
+                    await asyncio.to_thread(archive_file.write, compressor.compress(chunk))
+            tail = compressor.compress(b"\n".join(lines) + b"\n") if lines else b""
+            await asyncio.to_thread(archive_file.write, tail + compressor.flush())
+            archive_file.flush()
+            await asyncio.to_thread(os.fsync, archive_file.fileno())
+        os.replace(partial, path)
+        return count
+
+    async def expire_day(self, day: date) -> int:
+        """Delete an archived day's status checks; returns the number deleted"""
+        if not self.path_for(day).exists():
+            raise RuntimeError(f"{day.isoformat()} has no archive file, not deleting it")
+        start = datetime.combine(day, datetime.min.time())
+        result = await self.collection.delete_many({"timestamp": {"$gte": start, "$lt": start + timedelta(days=1)}})
+        return result.deleted_count
+
+    async def archive_pending(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archive every complete day that has no archive file yet, oldest first, and with
+        retention on, delete each archived day that ended more than retention_days ago.
+        Stops at the first error, leaving that day and later ones in place. Returns the
+        number archived per day.
+        """
+        now = now or datetime.utcnow()
+        oldest = await self.collection.find_one({}, {"_id": 0, "timestamp": 1}, sort=[("timestamp", 1)])
+        if oldest is None:
+            return {}
+        expire_before = now - timedelta(days=self.retention_days) if self.retention_days is not None else None
+        archived = {}
+        day = oldest["timestamp"].date()
+        while datetime.combine(day + timedelta(days=1), datetime.min.time()) + ARCHIVE_GRACE <= now:
+            if not self.path_for(day).exists():
+                archived[day.isoformat()] = await self.archive_day(day)
+                logger.info(f"Archived {archived[day.isoformat()]} status checks from {day.isoformat()}")
+            if expire_before is not None and datetime.combine(day + timedelta(days=1), datetime.min.time()) <= expire_before:
+                deleted = await self.expire_day(day)
+                logger.info(f"Deleted {deleted} archived status checks from {day.isoformat()}")
+            day += timedelta(days=1)
+        return archived
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive_pending()
+            except Exception as e:
+                logger.error(f"Status check archival failed, retrying in {self.interval_seconds}s: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Archive periodically in the background; a no-op while retention is off"""
+        if self.retention_days is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def read_day(self, day: date) -> Iterator[Dict[str, Any]]:
+        """Yield the status checks of an archived day, timestamps parsed back to datetimes"""
+        decompressor = zlib.decompressobj(wbits=31)
+        pending = b""
+        with open(self.path_for(day), "rb") as archive_file:
+            for block in iter(lambda: archive_file.read(1 << 16), b""):
+                pending += decompressor.decompress(block)
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield _parse_status_check(line)
+        pending += decompressor.flush()
+        if pending.strip():
+            yield _parse_status_check(pending)
+
+    async def restore(
+        self,
+        target_collection,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+    ) -> Dict[str, int]:
+        """
+        Load archived days in [since, until) into target_collection, keyed by the status
+        check id so restoring twice inserts nothing new. Restore into a collection other
+        than status_checks: restored documents are past retention by definition, and
+        would be deleted again.
+        """
+        restored = skipped = 0
+        for day in self.archived_days(since, until):
+            batch: List[Dict[str, Any]] = []
+            for status_check in self.read_day(day):
+                batch.append({"_id": status_check["id"], **status_check})
+                if len(batch) >= self.batch_size:
+                    inserted, duplicates = await _insert_ignoring_duplicates(target_collection, batch)
+                    restored, skipped, batch = restored + inserted, skipped + duplicates, []
+            if batch:
+                inserted, duplicates = await _insert_ignoring_duplicates(target_collection, batch)
+                restored, skipped = restored + inserted, skipped + duplicates
+        return {"restored": restored, "already_present": skipped}
+
+
+def _parse_status_check(line: bytes) -> Dict[str, Any]:
+    status_check = orjson.loads(line)
+    status_check["timestamp"] = datetime.fromisoformat(status_check["timestamp"])
+    return status_check
+
+
+async def _insert_ignoring_duplicates(collection, documents: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Insert documents, counting duplicate keys as already present; returns (inserted, duplicates)"""
+    from pymongo.errors import BulkWriteError
+
+    try:
+        await collection.insert_many(documents, ordered=False)
+        return len(documents), 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return len(documents) - len(errors), len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "archive", help="archive every complete day that has no archive file yet, then delete expired days"
+    )
+    restore = commands.add_parser("restore", help="load archive files back into Mongo")
+    restore.add_argument("--since", type=date.fromisoformat, help="first day to restore (YYYY-MM-DD)")
+    restore.add_argument("--until", type=date.fromisoformat, help="day to stop before (YYYY-MM-DD)")
+    restore.add_argument("--collection", default="status_checks_restored", help="target collection")
+    args = parser.parse_args()
+
+    import server
+    from settings import Settings
+    from structured_logging import configure_logging
+
+    settings = Settings.from_env()
+    configure_logging(settings)
+    services = server.Services(settings)
+
+    async def run():
+        try:
+            if args.command == "archive":
+                archived = await services.status_archiver.archive_pending()
+                print(f"Archived {sum(archived.values())} status checks from {len(archived)} days")
+            else:
+                result = await services.status_archiver.restore(services.db[args.collection], args.since, args.until)
+                print(f"Restored {result['restored']} status checks into {args.collection} "
+                      f"({result['already_present']} already present)")
+        finally:
+            await services.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
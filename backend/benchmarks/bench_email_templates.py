@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Email Template Rendering Benchmark
+Renders per second of the compiled, escaping templates in email_templates.py
+against the inline f-string the notification senders used to build.
+
+Usage: python backend/benchmarks/bench_email_templates.py [--seconds 2]
+"""
+
+import argparse
+import html
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from email_templates import TEMPLATES  # noqa: E402
+
+FORM_DATA = {
+    "name": "Priya Kapoor",
+    "email": "priya@example.com",
+    "message": "I'd like to learn more about the <community> & your coaching programme.\n" * 5,
+    "submitted_at": "2025-01-01 12:00:00 UTC",
+}
+
+
+def escaped_fstring_contact(form_data: Dict[str, Any]) -> str:
+    """The same f-string with every value passed through html.escape, for a like-for-like cost"""
+    escaped = {key: html.escape(str(value)) for key, value in form_data.items()}
+    return fstring_contact(escaped)
+
+
+def fstring_contact(form_data: Dict[str, Any]) -> str:
+    """The contact notification body as it was built before email_templates existed (no escaping)"""
+    return f"""
+        <html>
+            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                    <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
+                        💬 New Contact Inquiry - Collective Vox
+                    </h2>
+                    
+                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                        <h3 style="margin-top: 0; color: #333;">Contact Information</h3>
+                        <p><strong>Name:</strong> {form_data.get('name', 'Not provided')}</p>
+                        <p><strong>Email:</strong> {form_data.get('email', 'Not provided')}</p>
+                    </div>
+                    
+                    <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                        <h3 style="margin-top: 0; color: #333;">Message</h3>
+                        <p style="background-color: white; padding: 15px; border-radius: 4px; border-left: 4px solid #ff6b35; white-space: pre-wrap;">
+                            {form_data.get('message', 'No message provided')}
+                        </p>
+                    </div>
+                    
+                    <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
+                        <p style="margin: 0; font-size: 14px; color: #666;">
+                            This contact inquiry was submitted through collectivevox.app
+                        </p>
+                        <p style="margin: 5px 0 0 0; font-size: 14px; color: #666;">
+                            Submitted at: {form_data.get('submitted_at', 'Unknown')}
+                        </p>
+                    </div>
+                </div>
+            </body>
+        </html>
+        """
+
+
+def measure(render: Callable[[], object], seconds: float) -> float:
+    iterations = 0
+    batch = 1000
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            render()
+        iterations += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each variant")
+    args = parser.parse_args()
+
+    fstring_rate = measure(lambda: fstring_contact(FORM_DATA), args.seconds)
+    escaped_rate = measure(lambda: escaped_fstring_contact(FORM_DATA), args.seconds)
+    compiled_rate = measure(lambda: TEMPLATES["contact"].render(FORM_DATA), args.seconds)
+
+    print("\n📊 Contact notification body renders per second")
+    print(f"  inline f-string, unescaped : {fstring_rate:12,.0f}")
+    print(f"  inline f-string, escaped   : {escaped_rate:12,.0f}")
+    print(f"  compiled template, escaped : {compiled_rate:12,.0f}")
+    print(f"  compiled vs escaped f-string: {compiled_rate / escaped_rate:11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Email Transport Benchmark
+Measures send throughput and latency percentiles against the local fake providers:
+
+  Resend  - the pooled async ResendTransport against the synchronous resend SDK run
+            in worker threads (the previous notification path)
+  SMTP    - SMTPTransport reusing authenticated connections against the same transport
+            opening a connection per email (idle_timeout=0), with --handshake-ms
+            standing in for TCP/TLS setup and AUTH
+  sink    - MemoryTransport, the ceiling for everything in front of the provider
+
+Usage: python backend/benchmarks/bench_email_transport.py [--sends 500] [--concurrency 20] [--latency-ms 20] [--handshake-ms 30]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import resend
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from email_transport import MemoryTransport, ResendTransport, SMTPTransport  # noqa: E402
+from fake_email_provider import run_fake_provider, run_fake_smtp_server  # noqa: E402
+from stats import summarize  # noqa: E402
+
+PARAMS = {
+    "from": "Collective Vox <onboarding@resend.dev>",
+    "to": ["collectivevox@gmail.com"],
+    "subject": "Benchmark",
+    "html": "<p>benchmark</p>",
+}
+
+
+async def drive(send: Callable[[], Awaitable[object]], sends: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(sends)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def report(name: str, result: Dict[str, float]):
+    print(
+        f"  {name:<22} {result['throughput']:8.0f} sends/s"
+        f"  p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+    )
+
+
+async def run(sends: int, concurrency: int, latency_ms: float, handshake_ms: float):
+    async with run_fake_provider(latency_ms=latency_ms) as (base_url, provider):
+        transport = ResendTransport(
+            api_key="bench",
+            base_url=base_url,
+            max_connections=concurrency,
+            max_concurrency=concurrency,
+        )
+        pooled = await drive(lambda: transport.send(PARAMS), sends, concurrency)
+        await transport.aclose()
+
+        resend.api_key = "bench"
+        resend.api_url = base_url
+        threaded = await drive(lambda: asyncio.to_thread(resend.Emails.send, PARAMS), sends, concurrency)
+
+        print(f"\n📊 {sends} sends, concurrency {concurrency}, provider latency {latency_ms:.0f} ms")
+        report("async pooled transport", pooled)
+        report("sync SDK in threads", threaded)
+        print(f"  provider accepted {len(provider.state.sent)} messages")
+
+    async with run_fake_smtp_server(latency_ms=latency_ms, handshake_ms=handshake_ms) as (host, port, smtp):
+        results = {}
+        for name, idle_timeout in (("pooled connections", 60.0), ("connection per email", 0.0)):
+            transport = SMTPTransport(
+                host, port, username="bench", password="bench", starttls=False,
+                max_connections=concurrency, idle_timeout=idle_timeout,
+            )
+            results[name] = (await drive(lambda: transport.send(PARAMS), sends, concurrency), transport.connections_opened)
+            await transport.aclose()
+
+        print(f"\n📊 SMTP: {sends} sends, concurrency {concurrency}, "
+              f"{latency_ms:.0f} ms per message, {handshake_ms:.0f} ms per connection")
+        for name, (result, opened) in results.items():
+            report(name, result)
+            print(f"  {'':<22} {opened} connections opened")
+        print(f"  server accepted {len(smtp.sent)} messages")
+
+    sink = MemoryTransport()
+    result = await drive(lambda: sink.send(PARAMS), sends, concurrency)
+    print(f"\n📊 Memory sink: {sends} sends, concurrency {concurrency}")
+    report("memory sink", result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sends", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated provider latency")
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="simulated SMTP connection setup")
+    args = parser.parse_args()
+    asyncio.run(run(args.sends, args.concurrency, args.latency_ms, args.handshake_ms))
+
+
+if __name__ == "__main__":
+    main()
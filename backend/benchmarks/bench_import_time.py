@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Import Time / Cold Start Benchmark
+Measures how long a fresh interpreter takes to `import server` (which also builds the
+default app) using `python -X importtime`, lists the slowest imports and optionally
+fails when the median exceeds a budget.
+
+Each run is a new process, so nothing is shared between runs. MONGO_URL and DB_NAME
+are not needed: clients are only created when the app starts.
+
+Usage: python backend/benchmarks/bench_import_time.py [--runs 5] [--top 15] [--max-ms 600]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(module: str) -> Tuple[float, Dict[str, int]]:
+    """Run one cold import; returns (wall ms, cumulative import µs per module)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return wall_ms, cumulative
+
+
+def top_level(cumulative: Dict[str, int], exclude: Set[str]) -> List[Tuple[str, int]]:
+    """Top-level packages by cumulative import time, slowest first"""
+    packages: Dict[str, int] = {}
+    for name, micros in cumulative.items():
+        root = name.split(".")[0]
+        if root in exclude:
+            continue
+        # A package's own entry is cumulative over its submodules, so keep the largest
+        packages[root] = max(packages.get(root, 0), micros)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="server", help="module to import (default server)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to take the median over")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    parser.add_argument("--max-ms", type=float, help="exit non-zero if the median import exceeds this")
+    args = parser.parse_args()
+
+    # The interpreter's own startup (site, .pth hooks), to separate it from the cost of our imports
+    startup = [measure("sys") for _ in range(args.runs)]
+    baseline = statistics.median(wall_ms for wall_ms, _ in startup)
+    preloaded = {name.split(".")[0] for name in startup[0][1]}
+
+    walls, imports = [], []
+    for _ in range(args.runs):
+        wall_ms, cumulative = measure(args.module)
+        walls.append(wall_ms)
+        imports.append(cumulative)
+    import_ms = statistics.median(cumulative[args.module] / 1000 for cumulative in imports)
+    slowest = top_level(imports[len(imports) // 2], preloaded | {args.module})
+
+    print(f"\n📊 import {args.module}, median of {args.runs} fresh interpreters")
+    print(f"  interpreter startup : {baseline:8.1f} ms")
+    print(f"  process wall time   : {statistics.median(walls):8.1f} ms")
+    print(f"  import {args.module:<12} : {import_ms:8.1f} ms")
+    print("\n  slowest packages (cumulative):")
+    for name, micros in slowest[:args.top]:
+        print(f"    {name:<28}{micros / 1000:8.1f} ms")
+
+    heavy = [name for name in ("motor", "pymongo", "httpx", "resend", "pandas", "numpy", "boto3")
+             if any(module.split(".")[0] == name for module in imports[0])]
+    if heavy:
+        print(f"\n  ⚠️  imported eagerly: {', '.join(heavy)}")
+
+    if args.max_ms is not None and import_ms > args.max_ms:
+        print(f"\n❌ import {args.module} took {import_ms:.1f} ms, over the {args.max_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Logging Event Loop Stall Benchmark
+Logs from many concurrent coroutines while a monitor task measures how late the event
+loop wakes it (loop lag), once per logging setup:
+
+  direct  - the previous setup: logging.basicConfig's StreamHandler, formatting and
+            writing on the calling thread, i.e. on the event loop
+  queued  - structured_logging.configure_logging: records are queued and formatted as
+            JSON and written by the listener thread
+
+The log output goes to a stream whose every write takes --write-latency-us, standing
+in for a slow terminal, a full pipe to a log collector or a busy disk.
+
+Usage: python backend/benchmarks/bench_logging.py [--records 20000] [--concurrency 50] [--write-latency-us 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics  # noqa: E402
+import structured_logging  # noqa: E402
+from settings import Settings  # noqa: E402
+from stats import percentile  # noqa: E402
+
+
+class SlowStream:
+    """Writes to os.devnull, sleeping write_latency seconds per write"""
+
+    def __init__(self, write_latency: float):
+        self.write_latency = write_latency
+        self._sink = open(os.devnull, "w")
+        self.writes = 0
+
+    def write(self, text: str):
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        self.writes += 1
+        return self._sink.write(text)
+
+    def flush(self):
+        self._sink.flush()
+
+
+async def workload(records: int, concurrency: int) -> Dict[str, float]:
+    logger = logging.getLogger("bench")
+    lags: List[float] = []
+    in_logging = 0.0
+    stop = False
+
+    async def monitor():
+        while not stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def request(count: int, worker: int):
+        nonlocal in_logging
+        for i in range(count):
+            start = time.perf_counter()
+            logger.info(f"Handled request {i} on worker {worker}", extra={"worker": worker, "attempt": i})
+            in_logging += time.perf_counter() - start
+            await asyncio.sleep(0)
+
+    monitor_task = asyncio.create_task(monitor())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(request(records // concurrency, worker) for worker in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop = True
+    await monitor_task
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "in_logging_ms": in_logging * 1000,
+        "per_call_us": in_logging / records * 1e6,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+    }
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    stream = SlowStream(args.write_latency_us / 1e6)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=stream,
+        force=True,
+    )
+    results["direct"] = asyncio.run(workload(args.records, args.concurrency))
+    results["direct"]["drained"] = results["direct"]["elapsed"]
+
+    stream = SlowStream(args.write_latency_us / 1e6)
+    stderr, sys.stderr = sys.stderr, stream
+    try:
+        structured_logging.configure_logging(Settings(log_queue_size=args.queue_size))
+    finally:
+        sys.stderr = stderr
+    results["queued"] = asyncio.run(workload(args.records, args.concurrency))
+    start = time.perf_counter()
+    structured_logging.stop_logging()
+    results["queued"]["drained"] = results["queued"]["elapsed"] + time.perf_counter() - start
+    results["queued"]["dropped"] = sum(metrics.log_records_dropped._values.values())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="log records to emit")
+    parser.add_argument("--concurrency", type=int, default=50, help="coroutines logging concurrently")
+    parser.add_argument("--write-latency-us", type=float, default=50.0, help="time each write to the log stream takes")
+    parser.add_argument("--queue-size", type=int, default=100000, help="LOG_QUEUE_SIZE for the queued setup")
+    args = parser.parse_args()
+    results = run(args)
+
+    print(f"\n📊 {args.records} log records from {args.concurrency} coroutines, {args.write_latency_us:g} µs per write")
+    print(f"  {'setup':<8}{'on-loop ms':>12}{'µs/call':>9}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}{'written s':>11}")
+    for name, row in results.items():
+        print(
+            f"  {name:<8}{row['in_logging_ms']:>12.1f}{row['per_call_us']:>9.1f}{row['lag_p50_ms']:>12.2f}"
+            f"{row['lag_p99_ms']:>12.2f}{row['lag_max_ms']:>12.2f}{row['drained']:>11.2f}"
+        )
+    if results["queued"].get("dropped"):
+        print(f"  queued setup dropped {results['queued']['dropped']:.0f} records (queue full)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Status Check Ingest Benchmark
+Compares N single POST /api/status calls with one POST /api/status/batch call.
+
+Runs the FastAPI app in-process against the Mongo configured in backend/.env,
+writing into a throwaway "<DB_NAME>_bench" database that is dropped afterwards.
+
+Usage: python backend/benchmarks/bench_status_batch.py [--items 500] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+from settings import Settings  # noqa: E402
+
+
+async def post_single(http: httpx.AsyncClient, items: int) -> float:
+    start = time.perf_counter()
+    for i in range(items):
+        response = await http.post("/api/status", json={"client_name": f"bench_single_{i}"})
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def post_batch(http: httpx.AsyncClient, items: int) -> float:
+    payload = [{"client_name": f"bench_batch_{i}"} for i in range(items)]
+    start = time.perf_counter()
+    response = await http.post("/api/status/batch", json=payload)
+    response.raise_for_status()
+    assert response.json()["inserted"] == items
+    return time.perf_counter() - start
+
+
+async def run(settings: Settings, items: int, rounds: int):
+    bench_db_name = f"{settings.db_name}_bench"
+    app = server.create_app(settings.model_copy(update={"db_name": bench_db_name, "rate_limit_enabled": False}))
+    services = app.state.services
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            single_times, batch_times = [], []
+            for _ in range(rounds):
+                single_times.append(await post_single(http, items))
+                batch_times.append(await post_batch(http, items))
+    finally:
+        await services.client.drop_database(bench_db_name)
+        await services.shutdown()
+
+    single = statistics.median(single_times)
+    batch = statistics.median(batch_times)
+    print(f"\n📊 {items} status checks, median of {rounds} rounds")
+    print(f"  single POSTs : {single * 1000:9.1f} ms  {items / single:10.0f} docs/s")
+    print(f"  batch POST   : {batch * 1000:9.1f} ms  {items / batch:10.0f} docs/s")
+    print(f"  speedup      : {single / batch:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500, help="status checks per round")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds to take the median over")
+    args = parser.parse_args()
+    settings = Settings.from_env()
+    if not settings.mongo_url or not settings.db_name:
+        # The gap being measured is round trips to Mongo, which an in-memory stand-in does not have
+        sys.exit("MONGO_URL and DB_NAME must be set (e.g. in backend/.env) to run this benchmark")
+    asyncio.run(run(settings, args.items, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
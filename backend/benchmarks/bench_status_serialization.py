@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Status Read Serialization Benchmark
+Compares the CPU cost of turning status check documents into a GET /api/status body:
+
+  models  - the previous path: full documents (with _id), a StatusCheck per document
+            inside a StatusCheckPage, jsonable_encoder, then the stdlib JSONResponse
+  fast    - the current path: documents projected to the StatusCheck fields, encoded
+            directly with ORJSONResponse
+
+Documents are generated in memory, so only serialization is measured, not Mongo.
+
+Usage: python backend/benchmarks/bench_status_serialization.py [--sizes 1000,100000] [--rounds 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from starlette.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from server import StatusCheck, StatusCheckPage  # noqa: E402
+
+
+def make_documents(count: int):
+    now = datetime.utcnow().replace(microsecond=0)
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "client_name": f"client_{i % 50}",
+            "timestamp": now - timedelta(milliseconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+def render_models(documents) -> bytes:
+    page = StatusCheckPage(items=[StatusCheck(**document) for document in documents], next_cursor=None)
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def render_fast(documents) -> bytes:
+    return ORJSONResponse({"items": documents, "next_cursor": None}).body
+
+
+def timed(render, documents, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        render(documents)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated document counts")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds to take the median over")
+    args = parser.parse_args()
+
+    print(f"\n📊 Status page serialization, median of {args.rounds} rounds")
+    print(f"  {'documents':>10}{'models ms':>12}{'fast ms':>12}{'ms per 1k (models/fast)':>27}{'speedup':>10}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        documents = make_documents(size)
+        projected = [{key: document[key] for key in ("id", "client_name", "timestamp")} for document in documents]
+        # Both paths must produce the same JSON
+        assert render_models(projected[:10]) == render_fast(projected[:10])
+
+        models = timed(render_models, documents, args.rounds)
+        fast = timed(render_fast, projected, args.rounds)
+        per_1k = f"{models * 1e6 / size:.2f} / {fast * 1e6 / size:.2f}"
+        print(f"  {size:>10}{models * 1000:>12.1f}{fast * 1000:>12.1f}{per_1k:>27}{models / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Status Write-Behind Benchmark
+Drives POST /api/status in-process with concurrent clients, once with the direct
+insert_one path and once with STATUS_WRITE_BEHIND, and reports request latency,
+acknowledged throughput, durable throughput (until every document is in Mongo) and
+the number of insert round trips each path made.
+
+By default Mongo is the in-memory stand-in (mongomock-motor) with --mongo-latency-ms
+added to every write to model the network round trip. Pass --mongo-url to measure
+against a real mongod instead; a throwaway database is dropped afterwards.
+
+Usage: python backend/benchmarks/bench_status_write_behind.py [--requests 5000] [--concurrency 100] [--mongo-latency-ms 1]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+from settings import Settings  # noqa: E402
+from stats import summarize  # noqa: E402
+
+WRITE_METHODS = ("insert_one", "insert_many", "bulk_write")
+
+
+class RoundTripCollection:
+    """Collection proxy counting write calls and delaying each by a simulated round trip"""
+
+    def __init__(self, collection, latency: float, calls: Dict[str, int]):
+        self._collection = collection
+        self._latency = latency
+        self._calls = calls
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._collection, name)
+        if name not in WRITE_METHODS:
+            return attribute
+
+        async def call(*args, **kwargs):
+            self._calls[name] = self._calls.get(name, 0) + 1
+            if self._latency:
+                await asyncio.sleep(self._latency)
+            return await attribute(*args, **kwargs)
+        return call
+
+
+class RoundTripDatabase:
+    def __init__(self, database, latency: float, calls: Dict[str, int]):
+        self._database = database
+        self._latency = latency
+        self._calls = calls
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._database, name)
+        if name.startswith("status_"):
+            return RoundTripCollection(attribute, self._latency, self._calls)
+        return attribute
+
+
+async def run_mode(args, write_behind: bool) -> Dict[str, Any]:
+    db_name = f"bench_write_behind_{uuid.uuid4().hex[:8]}"
+    settings = Settings(
+        mongo_url=args.mongo_url or "mongodb://stand-in",
+        db_name=db_name,
+        rate_limit_enabled=False,
+        outbox_workers=0,
+        status_write_behind=write_behind,
+        status_write_buffer_max_items=args.batch_size,
+        status_write_buffer_flush_interval_ms=args.flush_interval_ms,
+    )
+    mongo_client = None
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient()
+    app = server.create_app(settings, mongo_client=mongo_client)
+    services = app.state.services
+    calls: Dict[str, int] = {}
+    services.__dict__["db"] = RoundTripDatabase(services.db, args.mongo_latency_ms / 1000, calls)
+
+    await app.router.startup()
+    latencies, errors = [], 0
+    remaining = args.requests
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+            async def client():
+                nonlocal remaining, errors
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    response = await http.post("/api/status", json={"client_name": f"bench_{remaining % 20}"})
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code != 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(args.concurrency)))
+            acknowledged = time.perf_counter() - start
+            if write_behind:
+                await services.status_write_buffer.stop()
+            durable = time.perf_counter() - start
+        stored = await services.db.status_checks.count_documents({})
+    finally:
+        await app.router.shutdown()
+        if args.mongo_url:
+            await services.client.drop_database(db_name)
+            services.client.close()
+
+    summary = summarize(latencies, acknowledged)
+    summary.update({
+        "errors": errors,
+        "stored": stored,
+        "durable_throughput": stored / durable,
+        "round_trips": calls.get("insert_one", 0) + calls.get("insert_many", 0),
+    })
+    return summary
+
+
+async def run(args):
+    results = {"direct": await run_mode(args, False), "write-behind": await run_mode(args, True)}
+    where = "real Mongo" if args.mongo_url else f"stand-in Mongo, {args.mongo_latency_ms:g} ms per write"
+    print(f"\n📊 {args.requests} POST /api/status, concurrency {args.concurrency}, {where}")
+    print(f"  {'mode':<14}{'ack req/s':>11}{'durable/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'inserts':>9}{'stored':>8}{'errors':>8}")
+    for mode, row in results.items():
+        print(
+            f"  {mode:<14}{row['throughput']:>11.0f}{row['durable_throughput']:>11.0f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            f"{row['round_trips']:>9}{row['stored']:>8}{row['errors']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="status checks to post per mode")
+    parser.add_argument("--concurrency", type=int, default=100, help="concurrent clients")
+    parser.add_argument("--batch-size", type=int, default=500, help="write-behind max_items")
+    parser.add_argument("--flush-interval-ms", type=float, default=50.0, help="write-behind flush interval")
+    parser.add_argument("--mongo-url", help="real Mongo to test against instead of the stand-in")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="simulated round trip per write")
+    args = parser.parse_args()
+    if args.mongo_url:
+        args.mongo_latency_ms = 0.0
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Backend Load Test
+Drives the FastAPI app in-process with concurrent clients and reports throughput
+and p50/p95/p99 latency per scenario.
+
+By default the app runs against an in-memory Mongo stand-in (mongomock-motor) and the
+local fake email provider, so no deployment, database or network is needed. Pass
+--mongo-url to measure against a real local mongod instead.
+
+Results can be written as JSON and compared with a previous run to catch regressions:
+    python backend/benchmarks/load_test.py --concurrency 50 --duration 20 --output results.json
+    python backend/benchmarks/load_test.py --baseline results.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+from fake_email_provider import run_fake_provider  # noqa: E402
+from stats import summarize  # noqa: E402
+
+DEFAULT_MIX = "root=1,status_list=4,status_create=4,form_notification=1"
+
+
+def scenario_root(http: httpx.AsyncClient):
+    return http.get("/api/")
+
+
+def scenario_status_list(http: httpx.AsyncClient):
+    return http.get("/api/status", params={"limit": 50})
+
+
+def scenario_status_create(http: httpx.AsyncClient):
+    return http.post("/api/status", json={"client_name": f"load_{random.randrange(100)}"})
+
+
+def scenario_form_notification(http: httpx.AsyncClient):
+    # Unique content so the dedup store does not short-circuit the request
+    return http.post(
+        "/api/send-form-notification",
+        json={
+            "form_type": random.choice(["assessment", "contact"]),
+            "form_data": {"name": "Load Test", "email": "load@example.com", "message": uuid.uuid4().hex},
+            "recipient_email": "collectivevox@gmail.com",
+        },
+    )
+
+
+SCENARIOS = {
+    "root": scenario_root,
+    "status_list": scenario_status_list,
+    "status_create": scenario_status_create,
+    "form_notification": scenario_form_notification,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def build_app(mongo_url: str, provider_url: str, rate_limit: bool):
+    """Create the app from server.py configured for the benchmark environment"""
+    import server
+    from settings import Settings
+
+    settings = Settings.from_env().model_copy(update={
+        "mongo_url": mongo_url or "mongodb://stand-in",
+        "db_name": os.getenv("DB_NAME") or "load_test",
+        "resend_api_url": provider_url,
+        "resend_api_key": os.getenv("RESEND_API_KEY") or "load-test",
+        "rate_limit_enabled": rate_limit,
+    })
+    mongo_client = None
+    if not mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient()
+    return server.create_app(settings, mongo_client=mongo_client)
+
+
+async def drive(app, weights: Dict[str, float], concurrency: int, duration: float, warmup: float):
+    names = list(weights)
+    scenario_weights = [weights[name] for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    errors: Dict[str, int] = defaultdict(int)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=30) as http:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        stop_at = measure_from + duration
+
+        async def client():
+            while loop.time() < stop_at:
+                # The in-memory stand-in never yields, so let outbox workers and other clients run
+                await asyncio.sleep(0)
+                name = random.choices(names, scenario_weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await SCENARIOS[name](http)
+                    status = response.status_code
+                except Exception:
+                    status = None
+                elapsed = time.perf_counter() - start
+                if loop.time() < measure_from:
+                    continue
+                if status is None:
+                    errors[name] += 1
+                    continue
+                statuses[name][status] += 1
+                if status >= 400:
+                    errors[name] += 1
+                latencies[name].append(elapsed)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    scenarios = {}
+    for name in names:
+        scenarios[name] = {
+            **summarize(latencies[name], duration),
+            "errors": errors[name],
+            "status_codes": {str(code): count for code, count in sorted(statuses[name].items())},
+        }
+    overall = summarize([value for name in names for value in latencies[name]], duration)
+    overall["errors"] = sum(errors.values())
+    return {"overall": overall, "scenarios": scenarios}
+
+
+def print_report(results: Dict[str, Any]):
+    config = results["config"]
+    print(f"\n📊 Load test: concurrency {config['concurrency']}, {config['duration']}s, mix {config['mix']}")
+    print(f"  {'scenario':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    rows = list(results["scenarios"].items()) + [("overall", results["overall"])]
+    for name, row in rows:
+        print(
+            f"  {name:<20}{row['requests']:>10}{row['throughput']:>10.0f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}"
+        )
+    print(f"  emails sent: {results['emails_sent']}, left in outbox: {results['outbox']['queue_depth']}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """Print the change against a baseline run; returns False if any scenario regressed too far"""
+    ok = True
+    print(f"\n📈 Against baseline from {baseline['config'].get('started_at', 'unknown')}")
+    for name, row in list(results["scenarios"].items()) + [("overall", results["overall"])]:
+        base = baseline["scenarios"].get(name) if name != "overall" else baseline.get("overall")
+        if not base or not base["throughput"] or not base["p95_ms"]:
+            continue
+        throughput_change = row["throughput"] / base["throughput"] - 1
+        p95_change = row["p95_ms"] / base["p95_ms"] - 1
+        regressed = throughput_change < -max_regression or p95_change > max_regression
+        ok = ok and not regressed
+        print(
+            f"  {'❌' if regressed else '✅'} {name:<20} throughput {throughput_change:+7.1%}  p95 {p95_change:+7.1%}"
+        )
+    return ok
+
+
+async def run(args) -> Dict[str, Any]:
+    async with run_fake_provider(latency_ms=args.provider_latency_ms) as (provider_url, provider):
+        app = build_app(args.mongo_url, provider_url, args.rate_limit)
+        services = app.state.services
+        await app.router.startup()
+        try:
+            results = await drive(app, parse_mix(args.mix), args.concurrency, args.duration, args.warmup)
+            drain_deadline = time.monotonic() + args.drain_timeout
+            while (await services.outbox.stats())["queue_depth"] and time.monotonic() < drain_deadline:
+                await asyncio.sleep(0.1)
+            results["outbox"] = await services.outbox.stats()
+        finally:
+            if args.mongo_url:
+                await services.client.drop_database(services.settings.db_name)
+            await app.router.shutdown()
+        results["emails_sent"] = len(provider.state.sent)
+    results["config"] = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "mix": args.mix,
+        "mongo": "real" if args.mongo_url else "stand-in",
+        "provider_latency_ms": args.provider_latency_ms,
+        "rate_limit": args.rate_limit,
+        "python": platform.python_version(),
+        "started_at": datetime.utcnow().isoformat(),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--mongo-url", help="real Mongo to test against; a dedicated DB_NAME is dropped afterwards")
+    parser.add_argument("--provider-latency-ms", type=float, default=20.0, help="fake email provider latency")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="seconds to let the outbox drain afterwards")
+    parser.add_argument("--rate-limit", action="store_true", help="keep rate limiting enabled")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated fractional regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
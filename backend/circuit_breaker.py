@@ -0,0 +1,108 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failures in a row the circuit opens and every call fails
+    immediately with CircuitOpenError for reset_timeout seconds. It then goes half-open
+    and lets a single trial call through: success closes the circuit, failure opens it
+    again for another reset_timeout.
+
+    Callers wrap each call in before_call() and record_success()/record_failure(),
+    or release() when it ended with neither; otherwise a half-open circuit stays shut.
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        on_state_change: Optional[Callable[[str], Any]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a call through again"""
+        if self.state == OPEN:
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        return 0.0
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            if self.on_state_change is not None:
+                self.on_state_change(state)
+
+    def before_call(self):
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected_calls += 1
+        # While a half-open trial is running, callers come back once it could have finished
+        raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def release(self):
+        """The call ended without an outcome (e.g. it was cancelled); let another trial through"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self._state != OPEN:
+                self.times_opened += 1
+            self._set_state(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "retry_after_seconds": self.retry_after(),
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+        }
@@ -0,0 +1,220 @@
+import zlib
+from typing import Dict, Optional, Sequence
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def gzip_compressor(level: int = 6):
+    """zlib compressor writing the gzip format (wbits=31), e.g. for .gz files, not a raw zlib stream"""
+    return zlib.compressobj(level, wbits=31)
+
+
+def gzip_compress(data: bytes, level: int = 6) -> bytes:
+    compressor = gzip_compressor(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ResponseCompressor:
+    """
+    Content negotiation and compression for HTTP responses.
+
+    Responses of an allowed content type (matched by prefix) and at least
+    minimum_size bytes are compressed with the encoding the client prefers among
+    those available: brotli when the brotli package is installed, and gzip. Ties in
+    the client's q-values go to brotli, which is both smaller and, at the default
+    quality, cheaper to produce for JSON.
+    """
+
+    def __init__(
+        self,
+        minimum_size: int = 1024,
+        content_types: Sequence[str] = DEFAULT_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # In order of preference
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    @classmethod
+    def from_settings(cls, settings) -> "ResponseCompressor":
+        return cls(
+            minimum_size=settings.compression_minimum_size,
+            content_types=[t.strip() for t in settings.compression_content_types.split(",") if t.strip()],
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """The encoding to use for a request's Accept-Encoding header, if any"""
+        if not accept_encoding:
+            return None
+        weights: Dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            weight = 1.0
+            for param in params.split(";"):
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            weights[coding.strip().lower()] = weight
+        best, best_weight = None, 0.0
+        for encoding in self.encodings:
+            weight = weights.get(encoding, weights.get("*", 0.0))
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
+
+    def compressible(self, content_type: Optional[str]) -> bool:
+        return bool(content_type) and content_type.lower().startswith(self.content_types)
+
+    def should_compress(self, content_type: Optional[str], size: int) -> bool:
+        return size >= self.minimum_size and self.compressible(content_type)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip_compress(body, self.gzip_level)
+        record_compression(encoding, len(body), len(compressed))
+        return compressed
+
+    def stream_encoder(self, encoding: str) -> "StreamEncoder":
+        return StreamEncoder(self, encoding)
+
+
+class StreamEncoder:
+    """Incremental compressor for streamed responses, whose size is not known up front"""
+
+    def __init__(self, compressor: ResponseCompressor, encoding: str):
+        self.encoding = encoding
+        self.original = 0
+        self.compressed = 0
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=compressor.brotli_quality)
+        else:
+            self._zlib = gzip_compressor(compressor.gzip_level)
+
+    def encode(self, chunk: bytes, last: bool) -> bytes:
+        """Compress a chunk, flushing it through so each chunk reaches the client as it is sent"""
+        if self.encoding == "br":
+            data = self._brotli.process(chunk) + (self._brotli.finish() if last else self._brotli.flush())
+        else:
+            data = self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+        self.original += len(chunk)
+        self.compressed += len(data)
+        if last:
+            record_compression(self.encoding, self.original, self.compressed)
+        return data
+
+
+def record_compression(encoding: str, original: int, compressed: int):
+    metrics.http_compression_bytes.inc(encoding, "original", amount=original)
+    metrics.http_compression_bytes.inc(encoding, "compressed", amount=compressed)
+
+
+def add_vary(headers: list) -> list:
+    """Add Accept-Encoding to the Vary header of a raw ASGI header list"""
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with a ResponseCompressor.
+
+    Responses that already carry a Content-Encoding (e.g. the response cache's
+    memoized variants) are passed through untouched. Single-message responses are
+    compressed whole, and only past the size threshold; streamed responses of an
+    allowed type are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, compressor: ResponseCompressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = self.compressor.negotiate(accept_encoding)
+
+        start_message = None
+        encoder: Optional[StreamEncoder] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not self.compressor.compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # The representation depends on Accept-Encoding even when it is sent as is
+                    message["headers"] = add_vary(list(message.get("headers", [])))
+                    passthrough = encoding is None
+                    if passthrough:
+                        await send(message)
+                    else:
+                        start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                # e.g. http.response.pathsend: the server sends the file itself, as is
+                if start_message is not None:
+                    start, start_message = start_message, None
+                    await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                if not more_body and len(body) < self.compressor.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = [
+                    (name, value) for name, value in start["headers"]
+                    if name.lower() not in (b"content-length", b"etag")
+                ]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if not more_body:
+                    body = self.compressor.compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    start["headers"] = headers
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                start["headers"] = headers
+                encoder = self.compressor.stream_encoder(encoding)
+                await send(start)
+            await send({"type": "http.response.body", "body": encoder.encode(body, not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
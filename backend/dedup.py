@@ -0,0 +1,97 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+def content_hash(form_type: str, form_data: Dict[str, Any]) -> str:
+    """Stable hash of a submission's content, independent of key order"""
+    canonical = json.dumps({"form_type": form_type, "form_data": form_data}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class DedupStore:
+    """
+    Remembers recently seen submission keys for window_seconds.
+
+    Keys live in an in-memory LRU bounded by max_entries, which answers repeats from
+    this process without any I/O. When a Mongo collection is given, keys are also
+    recorded there (expired by a TTL index) so duplicates are caught across processes.
+    """
+
+    def __init__(self, window_seconds: float = 600.0, max_entries: int = 10000, collection=None):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.collection = collection
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings, collection=None) -> "DedupStore":
+        return cls(
+            window_seconds=settings.dedup_window_seconds,
+            max_entries=settings.dedup_max_entries,
+            collection=collection if settings.dedup_backend == "mongo" else None,
+        )
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+    def _seen_locally(self, key: str, now: float) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def _remember_locally(self, key: str, now: float):
+        self._entries[key] = now + self.window_seconds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _claim_shared(self, key: str) -> bool:
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.window_seconds)
+        try:
+            await self.collection.insert_one({"_id": key, "expires_at": expires_at})
+            return True
+        except DuplicateKeyError:
+            # The TTL monitor only runs periodically, so take over entries that already expired
+            result = await self.collection.update_one(
+                {"_id": key, "expires_at": {"$lte": now}},
+                {"$set": {"expires_at": expires_at}},
+            )
+            return result.modified_count == 1
+
+    async def claim(self, keys: List[Optional[str]]) -> bool:
+        """
+        Record keys as seen. Returns False if any of them was already seen within the
+        window, meaning the submission is a duplicate and should not be processed.
+        """
+        keys = [key for key in keys if key]
+        now = time.monotonic()
+        duplicate = any([self._seen_locally(key, now) for key in keys])
+        if not duplicate and self.collection is not None:
+            for key in keys:
+                if not await self._claim_shared(key):
+                    duplicate = True
+        # Remember every key, so a retry under any of them is caught as well
+        for key in keys:
+            self._remember_locally(key, now)
+        return not duplicate
+
+    async def release(self, keys: List[Optional[str]]):
+        """Forget keys, e.g. when the submission they guarded could not be queued"""
+        keys = [key for key in keys if key]
+        for key in keys:
+            self._entries.pop(key, None)
+        if self.collection is not None and keys:
+            await self.collection.delete_many({"_id": {"$in": keys}})
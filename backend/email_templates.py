@@ -0,0 +1,173 @@
+import html
+import re
+from typing import Any, Dict, List, Tuple, Union
+
+# Placeholders look like {{ field }} or {{ field | default text }}
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*(?:\|\s*(.*?)\s*)?\}\}")
+
+
+class CompiledTemplate:
+    """
+    A template split once into static chunks and placeholders.
+
+    Static chunks are stored as ready-to-emit strings, so rendering is a single join
+    over precomputed text plus the substituted values. With escape=True every value
+    (and every default) is HTML-escaped; use escape=False for plain-text fields such
+    as email subjects.
+    """
+
+    def __init__(self, source: str, escape: bool = True):
+        self.escape = escape
+        self.parts: List[Union[str, Tuple[str, str]]] = []
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            if match.start() > position:
+                self.parts.append(source[position:match.start()])
+            default = match.group(2) or ""
+            self.parts.append((match.group(1), html.escape(default) if escape else default))
+            position = match.end()
+        if position < len(source):
+            self.parts.append(source[position:])
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """Substitute context values; missing or empty values fall back to the default"""
+        escape = html.escape if self.escape else str
+        out = []
+        append = out.append
+        for part in self.parts:
+            if part.__class__ is str:
+                append(part)
+                continue
+            value = context.get(part[0])
+            append(part[1] if value is None or value == "" else escape(str(value)))
+        return "".join(out)
+
+
+LAYOUT_HEAD = """<html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+"""
+
+LAYOUT_TAIL = """        </div>
+    </body>
+</html>
+"""
+
+ASSESSMENT_BODY = """            <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
+                🎯 New Free Assessment Request - Collective Vox
+            </h2>
+
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Contact Information</h3>
+                <p><strong>Name:</strong> {{ name | Not provided }}</p>
+                <p><strong>Email:</strong> {{ email | Not provided }}</p>
+                <p><strong>Phone:</strong> {{ phone | Not provided }}</p>
+            </div>
+
+            <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Professional Details</h3>
+                <p><strong>Industry:</strong> {{ industry | Not provided }}</p>
+                <p><strong>Job Title:</strong> {{ jobTitle | Not provided }}</p>
+                <p><strong>Experience Level:</strong> {{ experienceLevel | Not provided }}</p>
+            </div>
+
+            <div style="background-color: #d1ecf1; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Key Challenges</h3>
+                <p style="background-color: white; padding: 15px; border-radius: 4px; border-left: 4px solid #ff6b35;">
+                    {{ keyChallenges | Not provided }}
+                </p>
+            </div>
+
+            <div style="background-color: #d4edda; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Goals & Interests</h3>
+                <p><strong>Primary Goals:</strong> {{ primaryGoals | Not provided }}</p>
+                <p><strong>Interested In:</strong> {{ interestedIn | Not provided }}</p>
+                <p><strong>Preferred Meeting Times:</strong> {{ preferredTimes | Not provided }}</p>
+            </div>
+
+            <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
+                <p style="margin: 0; font-size: 14px; color: #666;">
+                    This assessment request was submitted through collectivevox.app
+                </p>
+                <p style="margin: 5px 0 0 0; font-size: 14px; color: #666;">
+                    Submitted at: {{ submitted_at | Unknown }}
+                </p>
+            </div>
+"""
+
+CONTACT_BODY = """            <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
+                💬 New Contact Inquiry - Collective Vox
+            </h2>
+
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Contact Information</h3>
+                <p><strong>Name:</strong> {{ name | Not provided }}</p>
+                <p><strong>Email:</strong> {{ email | Not provided }}</p>
+            </div>
+
+            <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">Message</h3>
+                <p style="background-color: white; padding: 15px; border-radius: 4px; border-left: 4px solid #ff6b35; white-space: pre-wrap;">
+                    {{ message | No message provided }}
+                </p>
+            </div>
+
+            <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
+                <p style="margin: 0; font-size: 14px; color: #666;">
+                    This contact inquiry was submitted through collectivevox.app
+                </p>
+                <p style="margin: 5px 0 0 0; font-size: 14px; color: #666;">
+                    Submitted at: {{ submitted_at | Unknown }}
+                </p>
+            </div>
+"""
+
+DIGEST_HEADER = """            <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
+                📬 {{ count }} New Submissions - Collective Vox
+            </h2>
+"""
+
+DIGEST_SECTION_HEAD = """            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #333;">{{ form_type }} from {{ name | Unknown }}</h3>
+                <table>
+"""
+
+DIGEST_ROW = """                    <tr><td style="padding: 4px 12px 4px 0; color: #666;"><strong>{{ key }}</strong></td><td style="padding: 4px 0;">{{ value }}</td></tr>
+"""
+
+DIGEST_SECTION_TAIL = """                </table>
+            </div>
+"""
+
+# Compiled once at import; the layout is part of each page so a render is one join
+TEMPLATES = {
+    "assessment": CompiledTemplate(LAYOUT_HEAD + ASSESSMENT_BODY + LAYOUT_TAIL),
+    "contact": CompiledTemplate(LAYOUT_HEAD + CONTACT_BODY + LAYOUT_TAIL),
+    "digest_header": CompiledTemplate(LAYOUT_HEAD + DIGEST_HEADER),
+    "digest_section_head": CompiledTemplate(DIGEST_SECTION_HEAD),
+    "digest_row": CompiledTemplate(DIGEST_ROW),
+}
+
+SUBJECTS = {
+    "assessment": CompiledTemplate("🎯 New Assessment Request from {{ name | Unknown }} - Collective Vox", escape=False),
+    "contact": CompiledTemplate("💬 New Contact from {{ name | Unknown }} - Collective Vox", escape=False),
+    "digest": CompiledTemplate("📬 {{ count }} new form submissions - Collective Vox", escape=False),
+}
+
+
+def render_notification(form_type: str, form_data: Dict[str, Any]) -> Tuple[str, str]:
+    """Render (subject, html) for a single assessment or contact submission"""
+    return SUBJECTS[form_type].render(form_data), TEMPLATES[form_type].render(form_data)
+
+
+def render_digest(submissions: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, str]:
+    """Render (subject, html) for a digest of (form_type, form_data) submissions"""
+    count = {"count": len(submissions)}
+    parts = [TEMPLATES["digest_header"].render(count)]
+    for form_type, form_data in submissions:
+        parts.append(TEMPLATES["digest_section_head"].render({**form_data, "form_type": form_type.capitalize()}))
+        for key, value in form_data.items():
+            parts.append(TEMPLATES["digest_row"].render({"key": key, "value": value}))
+        parts.append(DIGEST_SECTION_TAIL)
+    parts.append(LAYOUT_TAIL)
+    return SUBJECTS["digest"].render(count), "".join(parts)
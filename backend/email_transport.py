@@ -0,0 +1,450 @@
+import abc
+import asyncio
+import json
+import random
+import smtplib
+import ssl
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+import metrics
+from circuit_breaker import STATES, CircuitBreaker
+
+
+class EmailTransportError(Exception):
+    """Raised when the email provider rejects a message or cannot be reached"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self._retryable = retryable
+
+    @property
+    def retryable(self) -> bool:
+        """Network errors, timeouts, throttling and 5xx may succeed later; other 4xx will not"""
+        if self._retryable is not None:
+            return self._retryable
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def retry_options(settings) -> Dict[str, Any]:
+    """EmailTransport keyword arguments shared by every transport"""
+    return {
+        "max_retries": settings.email_max_retries,
+        "retry_base_seconds": settings.email_retry_base_seconds,
+        "retry_max_seconds": settings.email_retry_max_seconds,
+        "circuit_failure_threshold": settings.email_circuit_failure_threshold,
+        "circuit_reset_seconds": settings.email_circuit_reset_seconds,
+    }
+
+
+class EmailTransport(abc.ABC):
+    """
+    Interface of the ways notifications leave the app, with their shared retry policy.
+
+    Messages are dicts in the shape of the Resend API: "from", "to" (a list),
+    "subject" and "html". send() returns a dict with at least the message "id".
+
+    Calls made through _with_retries are retried up to max_retries times on retryable
+    errors, sleeping a random ("full jitter") delay of up to
+    retry_base_seconds * 2**attempt, capped at retry_max_seconds. Retryable failures
+    feed a circuit breaker: once it opens, sends raise CircuitOpenError immediately
+    instead of waiting on a provider that is down.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        retry_base_seconds: float = 0.2,
+        retry_max_seconds: float = 2.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+    ):
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker = CircuitBreaker(
+            "email_provider",
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout=circuit_reset_seconds,
+            on_state_change=_publish_circuit_state,
+        )
+        _publish_circuit_state(self.breaker.state)
+
+    async def _with_retries(self, call: Callable[..., Awaitable[Any]], *args) -> Any:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await call(*args)
+            except EmailTransportError as e:
+                if not e.retryable:
+                    # The provider answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                # An unexpected answer (e.g. a non-JSON 2xx from a proxy) counts against the provider
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: no outcome either way, but a half-open trial must not stay claimed
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    @abc.abstractmethod
+    async def send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one email. Returns the provider's response, e.g. {"id": "..."}."""
+
+    # Most emails one send_batch() call sends all or none of; None if the transport has no
+    # batch call of its own, so callers that need per-email outcomes should use send()
+    BATCH_LIMIT: Optional[int] = None
+
+    async def send_batch(self, params_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send several emails; returns one response per email. Concurrent sends by default."""
+        return list(await asyncio.gather(*(self.send(params) for params in params_list)))
+
+    async def aclose(self):
+        pass
+
+
+class ResendTransport(EmailTransport):
+    """
+    Async client for the Resend HTTP API.
+
+    A single httpx.AsyncClient keeps a pool of keep-alive connections to the provider,
+    so queued notifications reuse warm TLS connections instead of handshaking per email.
+    A semaphore bounds how many sends are in flight at once, and each request is
+    bounded by timeout as a whole.
+    """
+
+    # Resend accepts at most 100 emails per batch request
+    BATCH_LIMIT = 100
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = "https://api.resend.com",
+        max_connections: int = 10,
+        max_concurrency: int = 10,
+        timeout: float = 10.0,
+        **retry_kwargs,
+    ):
+        super().__init__(**retry_kwargs)
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "ResendTransport":
+        return cls(
+            api_key=settings.resend_api_key,
+            base_url=settings.resend_api_url,
+            max_connections=settings.email_max_connections,
+            max_concurrency=settings.email_max_concurrency,
+            timeout=settings.email_timeout,
+            **retry_options(settings),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _post(self, path: str, payload: Any) -> Any:
+        return await self._with_retries(self._post_once, path, payload)
+
+    async def _post_once(self, path: str, payload: Any) -> Any:
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self.client.post(path, json=payload), self.timeout)
+            except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                metrics.email_send_failures.inc(path, type(e).__name__)
+                raise EmailTransportError(f"Email provider request failed: {e!r}") from e
+            finally:
+                metrics.email_send_duration.observe(time.perf_counter() - start, path)
+        if response.status_code >= 400:
+            metrics.email_send_failures.inc(path, str(response.status_code))
+            raise EmailTransportError(
+                f"Email provider returned {response.status_code}: {response.text}",
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    async def send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._post("/emails", params)
+
+    async def send_batch(self, params_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send several emails through the batch endpoint, BATCH_LIMIT per call.
+        Returns one provider response entry per email.
+        """
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(params_list), self.BATCH_LIMIT):
+            chunk = params_list[start:start + self.BATCH_LIMIT]
+            response = await self._post("/emails/batch", chunk)
+            results.extend(response.get("data", []))
+        return results
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+
+def build_mime_message(params: Dict[str, Any]) -> EmailMessage:
+    """Turn Resend-style params into a multipart/alternative MIME message"""
+    message = EmailMessage()
+    message["From"] = params["from"]
+    message["To"] = ", ".join(params["to"])
+    message["Subject"] = params["subject"]
+    message["Date"] = formatdate(localtime=False)
+    message["Message-ID"] = make_msgid()
+    message.set_content("This notification is best viewed in an HTML capable email client.")
+    message.add_alternative(params["html"], subtype="html")
+    return message
+
+
+class SMTPTransport(EmailTransport):
+    """
+    Sends through an SMTP relay, reusing authenticated connections.
+
+    Up to max_connections connections are kept open; each is set up (TLS handshake,
+    EHLO, AUTH) once and then carries message after message, so a send usually costs a
+    single MAIL/RCPT/DATA exchange. smtplib is blocking, so every exchange runs in a
+    worker thread while the connection is checked out of the pool.
+
+    A connection idle for idle_timeout seconds, or that the server has closed in the
+    meantime, is replaced transparently. Transient replies (4xx), network errors and
+    timeouts are retried as retryable; permanent replies (5xx) are not.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        use_ssl: bool = False,
+        max_connections: int = 10,
+        timeout: float = 10.0,
+        idle_timeout: float = 60.0,
+        **retry_kwargs,
+    ):
+        super().__init__(**retry_kwargs)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls and not use_ssl
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._semaphore = asyncio.Semaphore(max_connections)
+        # Idle connections with the time they were last used; most recent last
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self.connections_opened = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "SMTPTransport":
+        if not settings.smtp_host:
+            raise RuntimeError("SMTP_HOST is required when EMAIL_TRANSPORT is smtp")
+        return cls(
+            host=settings.smtp_host,
+            port=settings.smtp_port,
+            username=settings.smtp_username,
+            password=settings.smtp_password,
+            starttls=settings.smtp_starttls,
+            use_ssl=settings.smtp_ssl,
+            max_connections=settings.email_max_connections,
+            timeout=settings.email_timeout,
+            idle_timeout=settings.smtp_idle_timeout_seconds,
+            **retry_options(settings),
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.starttls:
+                connection.starttls(context=ssl.create_default_context())
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password or "")
+        except BaseException:
+            _close_quietly(connection)
+            raise
+        self.connections_opened += 1
+        return connection
+
+    def _deliver(self, connection: Optional[smtplib.SMTP], message: EmailMessage) -> smtplib.SMTP:
+        """Send over connection (or a new one); returns the connection to keep (blocking)"""
+        if connection is not None:
+            try:
+                connection.send_message(message)
+                return connection
+            except smtplib.SMTPServerDisconnected:
+                # Closed by the server while idle: not a failure of this message
+                _close_quietly(connection)
+            except BaseException:
+                _close_quietly(connection)
+                raise
+        connection = self._connect()
+        try:
+            connection.send_message(message)
+        except BaseException:
+            _close_quietly(connection)
+            raise
+        return connection
+
+    async def _send_once(self, message: EmailMessage) -> Dict[str, Any]:
+        async with self._semaphore:
+            connection = None
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.idle_timeout:
+                    connection = candidate
+                    break
+                await asyncio.to_thread(_close_quietly, candidate)
+            start = time.perf_counter()
+            try:
+                connection = await asyncio.to_thread(self._deliver, connection, message)
+            except smtplib.SMTPResponseException as e:
+                metrics.email_send_failures.inc("smtp", str(e.smtp_code))
+                raise EmailTransportError(
+                    f"SMTP server replied {e.smtp_code}: {e.smtp_error!r}",
+                    status_code=e.smtp_code, retryable=400 <= e.smtp_code < 500,
+                ) from e
+            except smtplib.SMTPRecipientsRefused as e:
+                metrics.email_send_failures.inc("smtp", "recipients_refused")
+                transient = all(400 <= code < 500 for code, _ in e.recipients.values())
+                raise EmailTransportError(f"SMTP server refused recipients: {e.recipients!r}", retryable=transient) from e
+            except (smtplib.SMTPException, OSError) as e:
+                metrics.email_send_failures.inc("smtp", type(e).__name__)
+                raise EmailTransportError(f"SMTP delivery failed: {e!r}", retryable=True) from e
+            finally:
+                metrics.email_send_duration.observe(time.perf_counter() - start, "smtp")
+            self._idle.append((connection, time.monotonic()))
+        return {"id": message["Message-ID"]}
+
+    async def send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._with_retries(self._send_once, build_mime_message(params))
+
+    async def aclose(self):
+        idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            await asyncio.to_thread(_close_quietly, connection)
+
+
+def _close_quietly(connection: smtplib.SMTP):
+    try:
+        connection.quit()
+    except Exception:
+        connection.close()
+
+
+class MemoryTransport(EmailTransport):
+    """
+    Keeps sent emails in memory (the newest max_messages of them) instead of delivering
+    them, after an optional simulated latency. For local runs, tests and offline
+    throughput benchmarks of everything in front of the provider.
+    """
+
+    def __init__(self, latency: float = 0.0, max_messages: int = 10000, **retry_kwargs):
+        super().__init__(**retry_kwargs)
+        self.latency = latency
+        self.sent: "deque[Dict[str, Any]]" = deque(maxlen=max_messages)
+        self.count = 0
+
+    async def send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        email_id = str(uuid.uuid4())
+        self.sent.append({"id": email_id, **params})
+        self.count += 1
+        return {"id": email_id}
+
+
+class FileTransport(EmailTransport):
+    """Appends each email as a JSON line to path instead of delivering it, for local runs"""
+
+    # A batch is one write to the sink
+    BATCH_LIMIT = 1000
+
+    def __init__(self, path: Path, **retry_kwargs):
+        super().__init__(**retry_kwargs)
+        self.path = Path(path)
+        self._lock = asyncio.Lock()
+
+    def _append(self, lines: List[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as sink:
+            sink.write("".join(lines))
+
+    async def send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.send_batch([params]))[0]
+
+    async def send_batch(self, params_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results, lines = [], []
+        for params in params_list:
+            email_id = str(uuid.uuid4())
+            sent_at = datetime.utcnow().isoformat()
+            lines.append(json.dumps({"id": email_id, "sent_at": sent_at, **params}) + "\n")
+            results.append({"id": email_id})
+        async with self._lock:
+            await asyncio.to_thread(self._append, lines)
+        return results
+
+
+def transport_from_settings(settings, root_dir: Path) -> EmailTransport:
+    """The transport named by EMAIL_TRANSPORT; relative sink paths are under root_dir"""
+    if settings.email_transport == "resend":
+        return ResendTransport.from_settings(settings)
+    if settings.email_transport == "smtp":
+        return SMTPTransport.from_settings(settings)
+    if settings.email_transport == "memory":
+        return MemoryTransport(**retry_options(settings))
+    if settings.email_transport == "file":
+        path = Path(settings.email_sink_path)
+        return FileTransport(path if path.is_absolute() else root_dir / path, **retry_options(settings))
+    raise ValueError(f"Unknown EMAIL_TRANSPORT {settings.email_transport!r}")
+
+
+def _publish_circuit_state(state: str):
+    for name in STATES:
+        metrics.email_circuit_state.set(1 if name == state else 0, name)
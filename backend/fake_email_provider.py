@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Fake Email Provider
+A local stand-in for the Resend HTTP API, used to exercise and benchmark the email
+transport without network access or a real API key, plus a minimal SMTP server for
+the SMTP transport.
+
+Run standalone and point the backend at it:
+    python backend/fake_email_provider.py --port 8025 --latency-ms 50
+    RESEND_API_URL=http://127.0.0.1:8025 uvicorn server:app
+
+    python backend/fake_email_provider.py --smtp --port 2525 --handshake-ms 100
+    EMAIL_TRANSPORT=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=false uvicorn server:app
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+
+def create_fake_provider_app(latency_ms: float = 0.0, failure_rate: float = 0.0) -> FastAPI:
+    """
+    Build an app that accepts POST /emails and POST /emails/batch like Resend does.
+    Accepted messages are kept in app.state.sent and batch calls counted in app.state.batches.
+    """
+    app = FastAPI()
+    app.state.sent = []
+    app.state.batches = 0
+    app.state.latency_ms = latency_ms
+    app.state.failure_rate = failure_rate
+
+    @app.post("/emails")
+    async def send_email(request: Request):
+        params = await request.json()
+        if app.state.latency_ms:
+            await asyncio.sleep(app.state.latency_ms / 1000)
+        if app.state.failure_rate and random.random() < app.state.failure_rate:
+            raise HTTPException(status_code=503, detail="Simulated provider failure")
+        app.state.sent.append(params)
+        return {"id": str(uuid.uuid4())}
+
+    @app.post("/emails/batch")
+    async def send_email_batch(request: Request):
+        params_list = await request.json()
+        if app.state.latency_ms:
+            await asyncio.sleep(app.state.latency_ms / 1000)
+        if app.state.failure_rate and random.random() < app.state.failure_rate:
+            raise HTTPException(status_code=503, detail="Simulated provider failure")
+        app.state.sent.extend(params_list)
+        app.state.batches += 1
+        return {"data": [{"id": str(uuid.uuid4())} for _ in params_list]}
+
+    return app
+
+
+@asynccontextmanager
+async def run_fake_provider(latency_ms: float = 0.0, failure_rate: float = 0.0, port: int = 0):
+    """
+    Serve the fake provider on localhost for the duration of the block.
+    Yields (base_url, app); port=0 picks a free port.
+
+    The server runs on its own event loop in a background thread, so it does not
+    compete with the client being measured for the caller's loop.
+    """
+    app = create_fake_provider_app(latency_ms, failure_rate)
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Fake email provider failed to start")
+        await asyncio.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{bound_port}", app
+    finally:
+        server.should_exit = True
+        await asyncio.to_thread(thread.join)
+
+
+def create_fake_smtp_handler(latency_ms: float = 0.0, handshake_ms: float = 0.0):
+    """
+    Build an asyncio stream handler speaking just enough SMTP for smtplib: EHLO/HELO,
+    AUTH (any credentials), MAIL, RCPT, DATA, RSET, NOOP and QUIT. handshake_ms is
+    spent once per connection before the greeting, standing in for TCP/TLS setup and
+    authentication; latency_ms is spent on every accepted message.
+    Returns (handler, state) with the accepted messages in state.sent and the number
+    of connections in state.connections.
+    """
+    state = SimpleNamespace(sent=[], connections=0)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        state.connections += 1
+        if handshake_ms:
+            await asyncio.sleep(handshake_ms / 1000)
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 fake-smtp ready")
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await reply("250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif verb == "HELO":
+                    await reply("250 fake-smtp")
+                elif verb == "AUTH":
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data.append(chunk)
+                    if latency_ms:
+                        await asyncio.sleep(latency_ms / 1000)
+                    state.sent.append({"to": recipients, "data": b"".join(data)})
+                    await reply(f"250 OK queued as {uuid.uuid4().hex}")
+                elif verb in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+    return handle, state
+
+
+@asynccontextmanager
+async def run_fake_smtp_server(latency_ms: float = 0.0, handshake_ms: float = 0.0, port: int = 0):
+    """
+    Serve the fake SMTP server on localhost for the duration of the block, on its own
+    event loop in a background thread. Yields (host, port, state); port=0 picks a free port.
+    """
+    handle, state = create_fake_smtp_handler(latency_ms, handshake_ms)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    started = asyncio.run_coroutine_threadsafe(asyncio.start_server(handle, "127.0.0.1", port), loop)
+    server = await asyncio.wrap_future(started)
+    try:
+        yield "127.0.0.1", server.sockets[0].getsockname()[1], state
+    finally:
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.to_thread(thread.join)
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--smtp", action="store_true", help="serve SMTP instead of the Resend HTTP API")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every send")
+    parser.add_argument("--handshake-ms", type=float, default=0.0, help="SMTP only: delay per new connection")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of sends answered with 503")
+    args = parser.parse_args()
+    if args.smtp:
+        async def serve():
+            handle, _ = create_fake_smtp_handler(args.latency_ms, args.handshake_ms)
+            server = await asyncio.start_server(handle, "127.0.0.1", args.port)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve())
+        return
+    app = create_fake_provider_app(args.latency_ms, args.failure_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+
+from compression import ResponseCompressor, brotli, gzip_compress
+
+logger = logging.getLogger(__name__)
+
+# Build tools put a content hash in the names of files whose content never changes,
+# e.g. static/js/main.1a2b3c4d.js or static/media/logo.6ce24c58023cc2f8fd88fe9d219db6c6.svg
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Precompressed siblings, by content coding, in order of preference
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class StaticFile(NamedTuple):
+    path: Path
+    stat: os.stat_result
+    media_type: str
+    etag: str
+    cache_control: str
+    # Precompressed siblings by content coding: (path, stat)
+    variants: Dict[str, tuple]
+
+
+class StaticFrontend:
+    """
+    ASGI app serving a production frontend build (e.g. frontend/build) next to the API.
+
+    The build is scanned once by prepare(), at startup: every file gets a content-hash
+    ETag and, if its type is compressible and it is large enough, .br and .gz siblings
+    at maximum compression, written unless the build already has up-to-date ones.
+    Restart the server after deploying a new build.
+
+    Files with a hash in their name are served with an immutable, year-long
+    Cache-Control; everything else, index.html included, is revalidated with its ETag.
+    Paths that match no file and do not look like a file name get index.html, so
+    client-side routes load the app. Files are sent with FileResponse, which hands the
+    path to the server (and so to sendfile) where it supports the ASGI pathsend
+    extension, and streams it in chunks otherwise.
+    """
+
+    def __init__(
+        self,
+        build_dir: Path,
+        compressor: Optional[ResponseCompressor] = None,
+        precompress: bool = True,
+        api_prefix: str = "/api",
+    ):
+        self.build_dir = Path(build_dir)
+        self.compressor = compressor
+        self.precompress = precompress and compressor is not None
+        self.api_prefix = api_prefix
+        self._files: Optional[Dict[str, StaticFile]] = None
+
+    async def prepare(self):
+        self._files = await asyncio.to_thread(self._scan)
+        logger.info(f"Serving {len(self._files)} frontend files from {self.build_dir}")
+
+    def _scan(self) -> Dict[str, StaticFile]:
+        files = {}
+        for path in sorted(self.build_dir.rglob("*")):
+            if not path.is_file() or path.suffix in VARIANT_SUFFIXES.values():
+                continue
+            name = path.relative_to(self.build_dir).as_posix()
+            stat = path.stat()
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            content = path.read_bytes()
+            variants = {}
+            if self.compressor is not None and self.compressor.should_compress(media_type, len(content)):
+                for encoding in self.compressor.encodings:
+                    variant = self._variant(path, stat, content, encoding)
+                    if variant is not None:
+                        variants[encoding] = (variant, variant.stat())
+            files[name] = StaticFile(
+                path=path,
+                stat=stat,
+                media_type=media_type,
+                etag=hashlib.sha1(content).hexdigest()[:20],
+                cache_control=IMMUTABLE if HASHED_NAME.search(path.name) else "no-cache",
+                variants=variants,
+            )
+        return files
+
+    def _variant(self, path: Path, stat: os.stat_result, content: bytes, encoding: str) -> Optional[Path]:
+        """The up-to-date precompressed sibling of path, writing it if needed and allowed"""
+        variant = path.with_name(path.name + VARIANT_SUFFIXES[encoding])
+        if variant.exists() and variant.stat().st_mtime >= stat.st_mtime:
+            return variant
+        if not self.precompress:
+            return None
+        if encoding == "br":
+            compressed = brotli.compress(content, quality=11)
+        else:
+            compressed = gzip_compress(content, 9)
+        # Not worth a separate representation if it barely shrinks
+        if len(compressed) >= len(content) * 0.9:
+            return None
+        try:
+            partial = variant.with_name(f"{variant.name}.{os.getpid()}.partial")
+            partial.write_bytes(compressed)
+            os.replace(partial, variant)
+        except OSError as e:
+            logger.warning(f"Could not write {variant}, serving it uncompressed: {e}")
+            return None
+        return variant
+
+    def _lookup(self, path: str) -> Optional[StaticFile]:
+        name = path.strip("/") or "index.html"
+        found = self._files.get(name)
+        if found is None and "." not in name.rsplit("/", 1)[-1]:
+            # Client-side route: let the app's router handle it
+            found = self._files.get("index.html")
+        return found
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if self._files is None:
+            await self.prepare()
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        if path == self.api_prefix or path.startswith(self.api_prefix + "/"):
+            response: Response = JSONResponse({"detail": "Not Found"}, status_code=404)
+        elif scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            static_file = self._lookup(path)
+            response = PlainTextResponse("Not Found", status_code=404) if static_file is None else self._respond(scope, static_file)
+        await response(scope, receive, send)
+
+    def _respond(self, scope, static_file: StaticFile) -> Response:
+        headers = {"Cache-Control": static_file.cache_control}
+        file_path, stat, etag = static_file.path, static_file.stat, static_file.etag
+        if static_file.variants:
+            headers["Vary"] = "Accept-Encoding"
+            accept_encoding = None
+            for name, value in scope["headers"]:
+                if name == b"accept-encoding":
+                    accept_encoding = value.decode("latin-1")
+                    break
+            encoding = self.compressor.negotiate(accept_encoding)
+            if encoding in static_file.variants:
+                file_path, stat = static_file.variants[encoding]
+                etag = f"{etag}-{encoding}"
+                headers["Content-Encoding"] = encoding
+        headers["ETag"] = f'"{etag}"'
+
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if headers["ETag"] in [tag.strip() for tag in value.decode("latin-1").split(",")]:
+                    return Response(status_code=304, headers=headers)
+                break
+        return FileResponse(file_path, headers=headers, media_type=static_file.media_type, stat_result=stat)
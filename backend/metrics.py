@@ -0,0 +1,211 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    Base for metrics keyed by a tuple of label values.
+
+    Updates are plain dict and list operations with no locking: everything recorded
+    from the event loop is already serialized by it, and the GIL keeps each single
+    operation intact. Code that records from other threads wraps its calls in
+    a lock of its own (see mongo_metrics.MongoCommandMetrics).
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (non-cumulative) + overflow, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        # Snapshot first: Mongo listener threads may add series while this renders
+        for labels, (bucket_counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, inf)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+http_requests = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status")
+))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+mongo_command_duration = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection")
+))
+mongo_command_failures = REGISTRY.register(Counter(
+    "mongo_command_failures_total", "MongoDB commands that failed", ("command", "collection")
+))
+email_send_duration = REGISTRY.register(Histogram(
+    "email_provider_request_duration_seconds", "Email provider request latency", ("endpoint",)
+))
+email_send_failures = REGISTRY.register(Counter(
+    "email_provider_failures_total", "Email provider requests that failed", ("endpoint", "reason")
+))
+email_circuit_state = REGISTRY.register(Gauge(
+    "email_provider_circuit_state", "1 for the email provider circuit breaker's current state", ("state",)
+))
+mongo_pool_connections = REGISTRY.register(Gauge(
+    "mongo_pool_connections", "MongoDB pool connections by state", ("state",)
+))
+notification_queue_depth = REGISTRY.register(Gauge(
+    "notification_outbox_queue_depth", "Notifications waiting in the outbox or being sent"
+))
+notification_oldest_job_age = REGISTRY.register(Gauge(
+    "notification_outbox_oldest_job_age_seconds", "Age of the oldest unsent notification"
+))
+notification_failed_jobs = REGISTRY.register(Gauge(
+    "notification_outbox_failed_jobs", "Notifications that exhausted their retries"
+))
+notification_parked_jobs = REGISTRY.register(Gauge(
+    "notification_outbox_parked_jobs", "Notifications waiting for the email provider circuit to close"
+))
+status_write_buffer_pending = REGISTRY.register(Gauge(
+    "status_write_buffer_pending", "Status checks buffered and not yet written"
+))
+status_write_buffer_documents = REGISTRY.register(Counter(
+    "status_write_buffer_documents_total", "Buffered status checks by flush result", ("result",)
+))
+log_records_dropped = REGISTRY.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full"
+))
+http_compression_bytes = REGISTRY.register(Counter(
+    "http_response_compression_bytes_total", "Response bytes before and after compression", ("encoding", "size")
+))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and in-flight counts per route.
+
+    Requests are labelled with the matched route template (e.g. /api/status), not the
+    raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            http_request_duration.observe(elapsed, scope["method"], route_path)
+            http_requests.inc(scope["method"], route_path, str(status_code))
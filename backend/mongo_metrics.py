@@ -0,0 +1,109 @@
+# pymongo listeners live apart from metrics.py so importing the registry does not
+# import pymongo; only the code building the Mongo client needs them.
+import threading
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from metrics import mongo_command_duration, mongo_command_failures, mongo_pool_connections
+from profiler import current_profile
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener timing every command (insert, find, getMore, ...).
+
+    Motor runs pymongo on worker threads, so these callbacks arrive off the event loop
+    and take a lock; it is uncontended in practice and never touched by request code.
+    Commands issued while a request is being profiled are also counted on its profile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[Tuple[int, int], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.request_id, event.operation_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def _collection(self, event) -> str:
+        return self._collections.pop((event.request_id, event.operation_id), "")
+
+    def _profile(self, event):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.mongo_calls += 1
+            profile.mongo_seconds += event.duration_micros / 1e6
+
+    def succeeded(self, event):
+        with self._lock:
+            collection = self._collection(event)
+            mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+            self._profile(event)
+
+    def failed(self, event):
+        with self._lock:
+            collection = self._collection(event)
+            mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+            mongo_command_failures.inc(event.command_name, collection)
+            self._profile(event)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    pymongo connection pool (CMAP) listener tracking open and checked-out connections
+    across all servers. Callbacks arrive on driver threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+
+    def _publish(self):
+        mongo_pool_connections.set(self.open, "open")
+        mongo_pool_connections.set(self.in_use, "in_use")
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self._publish()
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+            self._publish()
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+            self._publish()
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+            self._publish()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
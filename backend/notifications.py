@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from circuit_breaker import CircuitOpenError
+from email_templates import render_digest, render_notification
+from outbox import PartialBatchError
+
+logger = logging.getLogger(__name__)
+
+EMAIL_FROM = "Collective Vox <onboarding@resend.dev>"
+NOTIFICATION_RECIPIENTS = ["collectivevox@gmail.com"]
+# Outbox payloads carry the form data plus, under this key, who the email goes to
+RECIPIENTS_KEY = "_recipients"
+
+# NOTIFICATION_MODE picks how queued notifications reach the provider:
+#   "single" - one email per submission (default, best for low traffic)
+#   "digest" - submissions within the outbox batch window become one summary email
+#   "batch"  - submissions within the window keep their own email but share one batch call
+NOTIFICATION_MODES = ("single", "digest", "batch")
+
+
+def _address_list(value: Optional[str]) -> List[str]:
+    return [address.strip() for address in (value or "").split(",") if address.strip()]
+
+
+class Notifier:
+    """
+    Builds the form notification emails and sends them through an EmailTransport
+    (see email_transport.py for Resend, SMTP and the local sinks).
+
+    A submission goes to the recipient_email it names, provided it is one of
+    allowed_recipients ("*" allows any address; the endpoint is public, so keep the list
+    short), and to the default recipients otherwise.
+    """
+
+    def __init__(
+        self,
+        transport,
+        email_from: str = EMAIL_FROM,
+        recipients: Sequence[str] = NOTIFICATION_RECIPIENTS,
+        allowed_recipients: Optional[Sequence[str]] = None,
+    ):
+        self.transport = transport
+        self.email_from = email_from
+        self.recipients = list(recipients)
+        allowed = self.recipients if allowed_recipients is None else allowed_recipients
+        self.allowed_recipients = {address.lower() for address in allowed}
+
+    @classmethod
+    def from_settings(cls, settings, transport) -> "Notifier":
+        allowed = settings.notification_allowed_recipients
+        return cls(
+            transport,
+            email_from=settings.email_from,
+            recipients=_address_list(settings.notification_recipients),
+            allowed_recipients=None if allowed is None else _address_list(allowed),
+        )
+
+    def recipients_for(self, recipient_email: Optional[str] = None) -> List[str]:
+        """Who a submission's email goes to; ValueError if recipient_email is not allowed"""
+        if not recipient_email:
+            return self.recipients
+        if "*" not in self.allowed_recipients and recipient_email.lower() not in self.allowed_recipients:
+            raise ValueError(f"{recipient_email} is not an allowed notification recipient")
+        return [recipient_email]
+
+    def payload_for(self, form_data: Dict[str, Any], recipients: Optional[List[str]] = None) -> Dict[str, Any]:
+        """The outbox payload for a submission, sent to recipients (the defaults if None)"""
+        return {**form_data, RECIPIENTS_KEY: recipients or self.recipients}
+
+    def _split(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        # Jobs queued before recipients were stored go to the defaults
+        form_data = {key: value for key, value in payload.items() if key != RECIPIENTS_KEY}
+        return form_data, payload.get(RECIPIENTS_KEY) or self.recipients
+
+    def _email(self, recipients: List[str], subject: str, html: str) -> Dict[str, Any]:
+        return {"from": self.email_from, "to": recipients, "subject": subject, "html": html}
+
+    def build_notification_email(self, form_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the transport params for an assessment or contact form notification"""
+        form_data, recipients = self._split(payload)
+        return self._email(recipients, *render_notification(form_type, form_data))
+
+    def build_digest_email(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine several queued submissions for the same recipients into a single summary email"""
+        submissions = [(job["type"], self._split(job["payload"])[0]) for job in jobs]
+        return self._email(self._split(jobs[0]["payload"])[1], *render_digest(submissions))
+
+    async def send_assessment_notification(self, payload: Dict[str, Any]) -> bool:
+        """Send email notification for assessment form submission"""
+        try:
+            email = await self.transport.send(self.build_notification_email("assessment", payload))
+            logger.info(f"Assessment notification sent successfully: {email}")
+            return True
+
+        except Exception as e:
+            # Raised, not swallowed, so the outbox retries the job (or parks it while the circuit is open)
+            logger.error(f"Error sending assessment notification: {str(e)}")
+            raise
+
+    async def send_contact_notification(self, payload: Dict[str, Any]) -> bool:
+        """Send email notification for contact form submission"""
+        try:
+            email = await self.transport.send(self.build_notification_email("contact", payload))
+            logger.info(f"Contact notification sent successfully: {email}")
+            return True
+
+        except Exception as e:
+            # Raised, not swallowed, so the outbox retries the job (or parks it while the circuit is open)
+            logger.error(f"Error sending contact notification: {str(e)}")
+            raise
+
+    async def send_digest_notification(self, jobs: List[Dict[str, Any]]) -> bool:
+        """
+        Send one digest email per set of recipients covering their jobs in the batch.
+        If a later group fails, PartialBatchError names the jobs already emailed.
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for job in jobs:
+            groups.setdefault(tuple(self._split(job["payload"])[1]), []).append(job)
+        sent_ids: List[str] = []
+        for group in groups.values():
+            try:
+                if len(group) == 1:
+                    email = await self.transport.send(self.build_notification_email(group[0]["type"], group[0]["payload"]))
+                else:
+                    email = await self.transport.send(self.build_digest_email(group))
+            except Exception as e:
+                logger.error(f"Error sending digest notification for {len(group)} submissions: {str(e)}")
+                if sent_ids:
+                    raise PartialBatchError(sent_ids, e) from e
+                raise
+            sent_ids.extend(job["id"] for job in group)
+            logger.info(f"Digest notification for {len(group)} submissions sent successfully: {email}")
+        return True
+
+    async def send_batched_notifications(self, jobs: List[Dict[str, Any]]) -> bool:
+        """
+        Send each job's own email: through the transport's batch call, BATCH_LIMIT emails
+        at a time, or concurrently one by one if it has none. If some fail,
+        PartialBatchError names the jobs already emailed.
+        """
+        limit = self.transport.BATCH_LIMIT
+        sent_ids: List[str] = []
+        errors: List[Exception] = []
+        if limit is None:
+            results = await asyncio.gather(
+                *(self.transport.send(self.build_notification_email(job["type"], job["payload"])) for job in jobs),
+                return_exceptions=True,
+            )
+            for job, result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    errors.append(result)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    sent_ids.append(job["id"])
+        else:
+            for start in range(0, len(jobs), limit):
+                chunk = jobs[start:start + limit]
+                try:
+                    await self.transport.send_batch(
+                        [self.build_notification_email(job["type"], job["payload"]) for job in chunk]
+                    )
+                except Exception as e:
+                    errors.append(e)
+                    break
+                sent_ids.extend(job["id"] for job in chunk)
+
+        if errors:
+            # The remaining jobs are parked if the circuit opened, retried otherwise
+            error = next((e for e in errors if not isinstance(e, CircuitOpenError)), errors[0])
+            logger.error(f"Error sending batched notifications, {len(sent_ids)} of {len(jobs)} sent: {str(error)}")
+            if sent_ids:
+                raise PartialBatchError(sent_ids, error) from error
+            raise error
+        logger.info(f"Batch of {len(sent_ids)} notifications sent successfully")
+        return True
+
+    def handlers(self) -> Dict[str, Callable]:
+        """Outbox handlers by job type"""
+        return {
+            "assessment": self.send_assessment_notification,
+            "contact": self.send_contact_notification,
+        }
+
+    def batch_handler(self, mode: str) -> Optional[Callable]:
+        """Outbox batch handler for a NOTIFICATION_MODE"""
+        if mode not in NOTIFICATION_MODES:
+            raise ValueError(f"Unknown NOTIFICATION_MODE {mode!r}")
+        return {"digest": self.send_digest_notification, "batch": self.send_batched_notifications}.get(mode)
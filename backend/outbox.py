@@ -0,0 +1,332 @@
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from circuit_breaker import CircuitOpenError
+from structured_logging import request_id
+
+logger = logging.getLogger(__name__)
+
+# A handler receives the job payload and returns True once the notification went out.
+# Synchronous handlers are run in a worker thread so they never block the event loop.
+OutboxHandler = Callable[[Dict[str, Any]], Union[bool, Awaitable[bool]]]
+# A batch handler receives several claimed jobs and sends them together, e.g. as one
+# digest email or one batch API call. It returns True once all of them went out, and
+# raises PartialBatchError if it failed after some of them went out.
+OutboxBatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[bool]]
+
+PENDING = "pending"
+PROCESSING = "processing"
+FAILED = "failed"
+
+
+class PartialBatchError(Exception):
+    """Raised by a batch handler that sent the jobs with sent_ids before error stopped it"""
+
+    def __init__(self, sent_ids: Iterable[str], error: Exception):
+        super().__init__(str(error))
+        self.sent_ids = set(sent_ids)
+        self.error = error
+
+
+class NotificationOutbox:
+    """
+    Durable notification queue backed by a Mongo collection.
+
+    Submissions are inserted as pending jobs and drained by a pool of async workers.
+    Each worker claims one job at a time with find_one_and_update, so any number of
+    workers across any number of processes can share the collection without two of
+    them sending the same job. A job whose worker died is reclaimed once its lease
+    expires, and failed sends are retried with backoff up to max_attempts.
+
+    With a batch_handler, each worker keeps claiming jobs for up to batch_window_seconds
+    (or until it holds batch_max_items) and hands them over together, which collapses a
+    burst of submissions into a handful of provider calls.
+
+    A handler raising CircuitOpenError has its jobs parked rather than failed: they go
+    back to pending until the circuit is due to close, without using up an attempt.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handlers: Dict[str, OutboxHandler],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        retry_backoff_seconds: float = 30.0,
+        batch_handler: Optional[OutboxBatchHandler] = None,
+        batch_max_items: int = 50,
+        batch_window_seconds: float = 5.0,
+    ):
+        self.collection = collection
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.batch_handler = batch_handler
+        self.batch_max_items = batch_max_items
+        self.batch_window_seconds = batch_window_seconds
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings,
+        collection,
+        handlers: Dict[str, OutboxHandler],
+        batch_handler: Optional[OutboxBatchHandler] = None,
+    ) -> "NotificationOutbox":
+        return cls(
+            collection,
+            handlers,
+            workers=settings.outbox_workers,
+            poll_interval=settings.outbox_poll_interval,
+            lease_seconds=settings.outbox_lease_seconds,
+            max_attempts=settings.outbox_max_attempts,
+            retry_backoff_seconds=settings.outbox_retry_backoff_seconds,
+            batch_handler=batch_handler,
+            batch_max_items=settings.outbox_batch_max_items,
+            batch_window_seconds=settings.outbox_batch_window_seconds,
+        )
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("status", 1), ("available_at", 1), ("created_at", 1)],
+            name="status_available_created",
+        )
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        """Persist a job and wake a local worker. Returns the job id."""
+        if job_type not in self.handlers:
+            raise ValueError(f"No outbox handler registered for {job_type!r}")
+        now = datetime.utcnow()
+        job_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "id": job_id,
+            "type": job_type,
+            "payload": payload,
+            # Sending is logged under the id of the request that queued the job
+            "request_id": request_id.get(),
+            "status": PENDING,
+            "attempts": 0,
+            "created_at": now,
+            "available_at": now,
+            "locked_by": None,
+            "locked_at": None,
+            "last_error": None,
+        })
+        self._wakeup.set()
+        return job_id
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest ready job, or a processing job whose lease expired."""
+        from pymongo import ReturnDocument
+
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "available_at": {"$lte": now}},
+                    {"status": PROCESSING, "locked_at": {"$lt": now - timedelta(seconds=self.lease_seconds)}},
+                ]
+            },
+            {
+                "$set": {"status": PROCESSING, "locked_by": worker_id, "locked_at": now, "parked": False},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def process(self, job: Dict[str, Any]) -> bool:
+        handler = self.handlers.get(job["type"])
+        error = None
+        token = request_id.set(job.get("request_id"))
+        try:
+            if handler is None:
+                raise ValueError(f"No outbox handler registered for {job['type']!r}")
+            if inspect.iscoroutinefunction(handler):
+                sent = await handler(job["payload"])
+            else:
+                sent = await asyncio.to_thread(handler, job["payload"])
+            if not sent:
+                error = "Handler reported failure"
+        except CircuitOpenError as e:
+            await self._park(job, e)
+            return False
+        except Exception as e:
+            sent = False
+            error = str(e)
+        finally:
+            request_id.reset(token)
+
+        await self._complete(job, sent, error)
+        return sent
+
+    async def process_batch(self, jobs: List[Dict[str, Any]]) -> bool:
+        failure: Optional[Exception] = None
+        # Logged under the ids of all the requests that queued the batch, comma-separated
+        ids = list(dict.fromkeys(job["request_id"] for job in jobs if job.get("request_id")))
+        token = request_id.set(",".join(ids) or None)
+        try:
+            sent = await self.batch_handler(jobs)
+        except PartialBatchError as e:
+            # Only the jobs that did not go out are retried or parked; the rest are done
+            for job in jobs:
+                if job["id"] in e.sent_ids:
+                    await self._complete(job, True, None)
+            jobs = [job for job in jobs if job["id"] not in e.sent_ids]
+            sent, failure = False, e.error
+        except Exception as e:
+            sent, failure = False, e
+        finally:
+            request_id.reset(token)
+
+        if isinstance(failure, CircuitOpenError):
+            for job in jobs:
+                await self._park(job, failure)
+            return False
+        if failure is not None:
+            error = str(failure)
+        else:
+            error = None if sent else "Batch handler reported failure"
+        for job in jobs:
+            await self._complete(job, sent, error)
+        return sent
+
+    async def _complete(self, job: Dict[str, Any], sent: bool, error: Optional[str]):
+        owned = {"id": job["id"], "locked_by": job["locked_by"]}
+        if sent:
+            await self.collection.delete_one(owned)
+            return
+
+        if job["attempts"] >= self.max_attempts:
+            logger.error(f"Outbox job {job['id']} ({job['type']}) failed permanently: {error}")
+            update = {"status": FAILED, "locked_by": None, "locked_at": None, "last_error": error}
+        else:
+            delay = self.retry_backoff_seconds * (2 ** (job["attempts"] - 1))
+            logger.warning(f"Outbox job {job['id']} ({job['type']}) failed, retrying in {delay:.0f}s: {error}")
+            update = {
+                "status": PENDING,
+                "available_at": datetime.utcnow() + timedelta(seconds=delay),
+                "locked_by": None,
+                "locked_at": None,
+                "last_error": error,
+            }
+        await self.collection.update_one(owned, {"$set": update})
+
+    async def _park(self, job: Dict[str, Any], error: CircuitOpenError):
+        """
+        Put a job back until the circuit lets calls through again. Parking does not use
+        up an attempt, so a provider outage of any length never fails a job by itself.
+        """
+        logger.info(f"Outbox job {job['id']} ({job['type']}) parked for {error.retry_after:.0f}s: {error}")
+        await self.collection.update_one(
+            {"id": job["id"], "locked_by": job["locked_by"]},
+            {
+                "$set": {
+                    "status": PENDING,
+                    "available_at": datetime.utcnow() + timedelta(seconds=error.retry_after),
+                    "locked_by": None,
+                    "locked_at": None,
+                    "last_error": str(error),
+                    "parked": True,
+                },
+                "$inc": {"attempts": -1},
+            },
+        )
+
+    async def _wait_for_work(self, timeout: float):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim_batch(self, first_job: Dict[str, Any], worker_id: str) -> List[Dict[str, Any]]:
+        """Keep claiming jobs until the batch is full or its window has elapsed"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window_seconds
+        jobs = [first_job]
+        while len(jobs) < self.batch_max_items and not self._stopping:
+            try:
+                job = await self.claim(worker_id)
+            except Exception as e:
+                # Send what is already claimed rather than leave it locked until the lease expires
+                logger.error(f"Outbox worker {worker_id} could not claim a job, sending a batch of {len(jobs)}: {e}")
+                break
+            if job is not None:
+                jobs.append(job)
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await self._wait_for_work(remaining)
+        return jobs
+
+    async def _worker(self, worker_id: str):
+        while not self._stopping:
+            try:
+                job = await self.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Outbox worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                await self._wait_for_work(self.poll_interval)
+                continue
+            try:
+                if self.batch_handler is not None:
+                    await self.process_batch(await self._claim_batch(job, worker_id))
+                else:
+                    await self.process(job)
+            except Exception as e:
+                # e.g. Mongo failing while the job is completed: its lease expires and it is
+                # claimed again, and the worker carries on with the next one
+                logger.error(f"Outbox worker {worker_id} failed processing job {job['id']}: {e}")
+
+    def start(self):
+        self._stopping = False
+        for i in range(self.workers):
+            worker_id = f"{self.worker_prefix}:{i}"
+            self._tasks.append(asyncio.create_task(self._worker(worker_id)))
+        logger.info(f"Started {self.workers} outbox workers")
+
+    async def stop(self):
+        """Let in-flight jobs finish, then stop the workers. Unclaimed jobs stay queued."""
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def stats(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        pending = await self.collection.count_documents({"status": PENDING})
+        processing = await self.collection.count_documents({"status": PROCESSING})
+        failed = await self.collection.count_documents({"status": FAILED})
+        parked = await self.collection.count_documents({"status": PENDING, "parked": True})
+        oldest = await self.collection.find_one(
+            {"status": {"$in": [PENDING, PROCESSING]}},
+            {"created_at": 1},
+            sort=[("created_at", 1)],
+        )
+        return {
+            "queue_depth": pending + processing,
+            "pending": pending,
+            "processing": processing,
+            "failed": failed,
+            "parked": parked,
+            "oldest_job_age_seconds": (now - oldest["created_at"]).total_seconds() if oldest else 0.0,
+            "workers": sum(1 for task in self._tasks if not task.done()),
+        }
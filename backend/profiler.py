@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being served, if it is being sampled. Motor copies the
+# context into its worker threads, so the Mongo command listener sees it too.
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+# Leaf frame added to stacks of requests that were suspended in an await when sampled
+WAITING = ("(awaiting)", "", 0)
+
+Frame = Tuple[str, str, int]
+
+
+class RequestProfile:
+    """Stack samples and counters collected for one in-flight request"""
+
+    __slots__ = ("task", "method", "path", "started_at", "start", "samples", "on_cpu", "mongo_calls", "mongo_seconds")
+
+    def __init__(self, task: asyncio.Task, method: str, path: str):
+        self.task = task
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.samples: List[Tuple[Frame, ...]] = []
+        self.on_cpu = 0
+        self.mongo_calls = 0
+        self.mongo_seconds = 0.0
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (code.co_qualname if hasattr(code, "co_qualname") else code.co_name, code.co_filename, frame.f_lineno)
+
+
+def _running_stack(frame) -> Tuple[Frame, ...]:
+    """Stack of the event loop thread, from the task step that is running down to the leaf"""
+    stack: List[Frame] = []
+    while frame is not None:
+        # Everything above the task's step is event loop machinery shared by all requests
+        if frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _awaiting_stack(task: asyncio.Task) -> Tuple[Frame, ...]:
+    """Stack of a suspended task, following its chain of awaited coroutines"""
+    stack: List[Frame] = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_key(frame))
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+            or getattr(awaitable, "ag_await", None)
+        )
+    stack.append(WAITING)
+    return tuple(stack)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of in-flight requests from a background thread.
+
+    Every interval seconds the sampler records, for each tracked request, either the
+    event loop thread's real stack (if that request's task is the one running) or the
+    chain of coroutines it is suspended in, ending in "(awaiting)". Requests are
+    tracked if they are picked by sample_rate or, with slow_ms set, all of them; a
+    profile is only written for picked requests and those that took slow_ms or longer.
+    Whether a request will be slow is only known at the end, so with slow_ms set the
+    sampler runs whenever a request is in flight; the cost is one thread waking every
+    interval to copy a few stacks.
+
+    Profiles go to output_dir as speedscope JSON or collapsed stacks, with the route,
+    timings and Mongo call counts attached; only the newest max_files are kept. The
+    sampler thread sleeps while no request is tracked, and the middleware is not
+    installed at all unless profiling is enabled.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        slow_ms: Optional[float] = 500.0,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+        max_files: int = 100,
+        output_format: str = "speedscope",
+    ):
+        if output_format not in ("speedscope", "collapsed"):
+            raise ValueError(f"Unknown profile format {output_format!r}")
+        self.output_dir = Path(output_dir)
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_files = max_files
+        self.output_format = output_format
+        self._active: Dict[int, Tuple[RequestProfile, bool]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._loop = None
+        self._loop_thread_id = 0
+        self.written = 0
+
+    def should_track(self) -> Tuple[bool, bool]:
+        """(track, picked): picked requests are written whatever their duration"""
+        picked = self.sample_rate > 0 and random.random() < self.sample_rate
+        return picked or self.slow_ms is not None, picked
+
+    def begin(self, method: str, path: str, picked: bool) -> RequestProfile:
+        task = asyncio.current_task()
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        profile = RequestProfile(task, method, path)
+        with self._lock:
+            self._active[id(profile)] = (profile, picked)
+        self._wakeup.set()
+        return profile
+
+    def end(self, profile: RequestProfile) -> bool:
+        """Stop sampling a request; returns whether its profile should be written"""
+        with self._lock:
+            _, picked = self._active.pop(id(profile))
+        elapsed_ms = (time.perf_counter() - profile.start) * 1000
+        return picked or (self.slow_ms is not None and elapsed_ms >= self.slow_ms)
+
+    def _run(self):
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+        while not self._stopping:
+            if not self._active:
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = [profile for profile, _ in self._active.values()]
+            if not profiles:
+                continue
+            running = current_tasks.get(self._loop)
+            loop_frame = sys._current_frames().get(self._loop_thread_id)
+            for profile in profiles:
+                if profile.task is running and loop_frame is not None:
+                    profile.samples.append(_running_stack(loop_frame))
+                    profile.on_cpu += 1
+                else:
+                    profile.samples.append(_awaiting_stack(profile.task))
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    def write(self, profile: RequestProfile, route: str, status_code: int):
+        """Write a finished request's profile and trim the ring to max_files (blocking)"""
+        elapsed_ms = (time.perf_counter() - profile.start) * 1000
+        metadata = {
+            "method": profile.method,
+            "route": route,
+            "path": profile.path,
+            "status_code": status_code,
+            "started_at": profile.started_at,
+            "duration_ms": round(elapsed_ms, 3),
+            "sample_interval_ms": self.interval * 1000,
+            "samples": len(profile.samples),
+            "on_cpu_samples": profile.on_cpu,
+            "mongo_calls": profile.mongo_calls,
+            "mongo_ms": round(profile.mongo_seconds * 1000, 3),
+        }
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{int(profile.started_at * 1000)}-{profile.method}-{slug}-{int(elapsed_ms)}ms"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.output_format == "speedscope":
+            path = self.output_dir / f"{name}.speedscope.json"
+            path.write_text(json.dumps(self._speedscope(profile, metadata, name)))
+        else:
+            path = self.output_dir / f"{name}.collapsed"
+            path.write_text(self._collapsed(profile, metadata))
+        self.written += 1
+
+        # Names start with the request's start time in milliseconds, so they sort oldest first
+        files = sorted(
+            [*self.output_dir.glob("*.speedscope.json"), *self.output_dir.glob("*.collapsed")],
+            key=lambda file: file.name,
+        )
+        for old in files[:-self.max_files]:
+            old.unlink(missing_ok=True)
+
+    def _speedscope(self, profile: RequestProfile, metadata: Dict[str, Any], name: str) -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Frame, int] = {}
+        samples = []
+        for stack in profile.samples:
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+        interval_ms = self.interval * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "backend-request-profiler",
+            "metadata": metadata,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{metadata['method']} {metadata['route']}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": len(samples) * interval_ms,
+                "samples": samples,
+                "weights": [interval_ms] * len(samples),
+            }],
+        }
+
+    @staticmethod
+    def _collapsed(profile: RequestProfile, metadata: Dict[str, Any]) -> str:
+        counts: Dict[str, int] = {}
+        for stack in profile.samples:
+            line = ";".join(f"{frame[0]} ({os.path.basename(frame[1])}:{frame[2]})" if frame[1] else frame[0] for frame in stack)
+            counts[line] = counts.get(line, 0) + 1
+        header = "".join(f"# {key}: {value}\n" for key, value in metadata.items())
+        return header + "".join(f"{line} {count}\n" for line, count in counts.items())
+
+
+class ProfilerMiddleware:
+    """ASGI middleware handing requests to a SamplingProfiler and writing their profiles"""
+
+    def __init__(self, app, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        track, picked = self.profiler.should_track()
+        if not track:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = self.profiler.begin(scope["method"], scope["path"], picked)
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            if self.profiler.end(profile):
+                route = scope.get("route")
+                route_path = route.path if route is not None else "unmatched"
+                try:
+                    await asyncio.to_thread(self.profiler.write, profile, route_path, status_code)
+                except Exception as e:
+                    logger.error(f"Could not write request profile: {e}")
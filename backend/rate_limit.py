@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule(NamedTuple):
+    """Token bucket sizes for one route: a burst capacity and a refill rate in tokens per second"""
+    client_capacity: float
+    client_refill_per_second: float
+    route_capacity: float
+    route_refill_per_second: float
+
+
+class MemoryTokenBuckets:
+    """
+    Token buckets held in process memory.
+
+    Each bucket is a two-item list [tokens, last_refill] in an LRU keyed by bucket name,
+    so idle clients are evicted first once max_entries is reached. An evicted bucket
+    simply starts full again, which errs on the side of letting traffic through.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        pass
+
+    async def acquire(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / refill_per_second
+
+
+class MongoTokenBuckets:
+    """
+    Token buckets shared by every worker process through a Mongo collection.
+
+    Refill and take happen in one find_one_and_update with an aggregation-pipeline
+    update, so concurrent processes never race on a bucket. Buckets untouched for
+    idle_ttl_seconds are removed by a TTL index.
+    """
+
+    def __init__(self, collection, idle_ttl_seconds: int = 3600):
+        self.collection = collection
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            "updated_at", expireAfterSeconds=self.idle_ttl_seconds, name="updated_at_ttl"
+        )
+
+    async def acquire(self, key: str, capacity: float, refill_per_second: float) -> float:
+        from pymongo import ReturnDocument
+
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {
+            "$min": [
+                capacity,
+                {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed_seconds, refill_per_second]}]},
+            ]
+        }
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / refill_per_second
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing token buckets per client IP and per route.
+
+    Only requests matching a (method, path) rule are counted; everything else passes
+    straight through. A request must get a token from its client's bucket and from the
+    route-wide bucket, otherwise it is answered with 429 and a Retry-After header
+    before reaching the endpoint.
+
+    get_buckets is called on the first rate-limited request rather than when the app is
+    built, so a Mongo-backed store does not need a database client at import time.
+
+    The limiter fails open: if the bucket store errors or takes longer than
+    store_timeout seconds (e.g. Mongo is unreachable), the request is let through
+    rather than failed, so a database blip does not take the form endpoints down.
+    """
+
+    def __init__(
+        self,
+        app,
+        rules: Dict[Tuple[str, str], RateLimitRule],
+        get_buckets: Callable[[], "MemoryTokenBuckets | MongoTokenBuckets"],
+        trusted_proxies: int = 0,
+        store_timeout: float = 0.5,
+    ):
+        self.app = app
+        self.rules = rules
+        self.get_buckets = get_buckets
+        self.buckets = None
+        self.trusted_proxies = trusted_proxies
+        self.store_timeout = store_timeout
+
+    def client_ip(self, scope) -> str:
+        """
+        The connecting address, or behind trusted_proxies proxies the address the
+        outermost of them appended to X-Forwarded-For. Entries to the left of it were
+        sent by the client and can be anything, so they are never used.
+        """
+        if self.trusted_proxies:
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            if len(forwarded) >= self.trusted_proxies:
+                return forwarded[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule: Optional[RateLimitRule] = self.rules.get((scope["method"], scope["path"]))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {scope['path']}"
+        try:
+            retry_after = await asyncio.wait_for(self._retry_after(scope, rule, route), self.store_timeout)
+        except Exception as e:
+            logger.warning(f"Rate limit check for {route} failed, letting the request through: {e!r}")
+            retry_after = 0.0
+        if retry_after:
+            response = JSONResponse(
+                {"detail": "Too many requests, please retry later"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _retry_after(self, scope, rule: RateLimitRule, route: str) -> float:
+        """Take a token from the client's bucket, then the route's; 0 if both had one"""
+        if self.buckets is None:
+            self.buckets = self.get_buckets()
+        retry_after = await self.buckets.acquire(
+            f"client:{self.client_ip(scope)}:{route}", rule.client_capacity, rule.client_refill_per_second
+        )
+        if not retry_after:
+            retry_after = await self.buckets.acquire(
+                f"route:{route}", rule.route_capacity, rule.route_refill_per_second
+            )
+        return retry_after
+
+
+def buckets_from_settings(settings, collection=None):
+    """rate_limit_backend "mongo" shares buckets across processes; the default is per process"""
+    if settings.rate_limit_backend == "mongo":
+        return MongoTokenBuckets(collection, idle_ttl_seconds=settings.rate_limit_idle_ttl_seconds)
+    return MemoryTokenBuckets(max_entries=settings.rate_limit_max_buckets)
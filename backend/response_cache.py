@@ -0,0 +1,154 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
+from starlette.responses import Response
+
+from compression import ResponseCompressor
+
+
+class CachedResponse(NamedTuple):
+    expires_at: float
+    body: bytes
+    etag: str
+    media_type: str
+    # Compressed variants of body by content coding, filled in on first request
+    encoded: Dict[str, bytes]
+
+
+class ResponseCache:
+    """
+    In-process cache of serialized GET responses with strong ETags.
+
+    Entries are keyed by path and query string, expire after ttl_seconds and are
+    evicted least-recently-used beyond max_entries. A hit skips both the database and
+    serialization; a matching If-None-Match is answered with an empty 304. A response
+    built while invalidate() ran is served but not cached, as it may predate the write.
+
+    With a compressor, entries are sent in the encoding the client accepts, and each
+    encoding of an entry is compressed once and kept with it, so hits skip compression
+    as well. Encoded variants get their own ETag, as the bytes differ.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 256, compressor: Optional[ResponseCompressor] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.compressor = compressor
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.compressions = 0
+        self.stale_builds = 0
+        # Bumped by invalidate(), so a build that overlapped a write is not cached
+        self._generation = 0
+
+    @classmethod
+    def from_settings(cls, settings, compressor: Optional[ResponseCompressor] = None) -> "ResponseCache":
+        return cls(
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            max_entries=settings.response_cache_max_entries,
+            compressor=compressor,
+        )
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        return f"{request.url.path}?{query}"
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _entry(self, body: bytes, media_type: str) -> CachedResponse:
+        return CachedResponse(
+            expires_at=time.monotonic() + self.ttl_seconds,
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            media_type=media_type,
+            encoded={},
+        )
+
+    def set(self, key: str, body: bytes, media_type: str) -> CachedResponse:
+        entry = self._entry(body, media_type)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, path_prefix: str = ""):
+        """Drop every entry whose path starts with path_prefix (all entries by default)"""
+        for key in [key for key in self._entries if key.startswith(path_prefix)]:
+            del self._entries[key]
+        self._generation += 1
+        self.invalidations += 1
+
+    async def respond(self, request: Request, build: Callable[[], Awaitable[Any]]) -> Response:
+        """
+        Serve request from the cache, calling build() and caching its JSON on a miss.
+        build() returns plain JSON-compatible data (dicts, lists, datetimes), which is
+        encoded with orjson as is; pydantic models are not accepted.
+        """
+        key = self.key_for(request)
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            generation = self._generation
+            rendered = ORJSONResponse(await build())
+            if generation == self._generation:
+                entry = self.set(key, rendered.body, rendered.media_type)
+            else:
+                # Invalidated while building: the result may predate the write, so serve it
+                # to this request only
+                self.stale_builds += 1
+                entry = self._entry(rendered.body, rendered.media_type)
+        else:
+            self.hits += 1
+
+        body, etag, headers = entry.body, entry.etag, {"Cache-Control": "no-cache"}
+        compressor = self.compressor
+        if compressor is not None and compressor.compressible(entry.media_type):
+            headers["Vary"] = "Accept-Encoding"
+            encoding = compressor.negotiate(request.headers.get("accept-encoding"))
+            if encoding is not None and len(entry.body) >= compressor.minimum_size:
+                if encoding not in entry.encoded:
+                    entry.encoded[encoding] = compressor.compress(entry.body, encoding)
+                    self.compressions += 1
+                body, etag = entry.encoded[encoding], f'{entry.etag[:-1]}-{encoding}"'
+                headers["Content-Encoding"] = encoding
+        headers["ETag"] = etag
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=entry.media_type, headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "compressions": self.compressions,
+            "stale_builds": self.stale_builds,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Status Check Rollups
+Per-client minute and hour counts of status checks, kept up to date by the server on
+every write. The rebuild command recounts them from status_checks, to backfill or repair.
+
+Usage:
+    python backend/rollups.py rebuild [--since 2024-05-01T00:00] [--until 2024-06-01T00:00]
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bucket sizes kept for every status check, in seconds
+GRANULARITIES = {"minute": 60, "hour": 3600}
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the minute or hour bucket containing timestamp"""
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _bucket_expression(granularity: str) -> Dict[str, Any]:
+    # $dateFromParts rather than $dateTrunc, which needs MongoDB 5.0
+    parts = {
+        "year": {"$year": "$timestamp"},
+        "month": {"$month": "$timestamp"},
+        "day": {"$dayOfMonth": "$timestamp"},
+        "hour": {"$hour": "$timestamp"},
+    }
+    if granularity == "minute":
+        parts["minute"] = {"$minute": "$timestamp"}
+    return {"$dateFromParts": parts}
+
+
+class StatusRollups:
+    """
+    Status check counts per client_name per minute and per hour.
+
+    Every write bumps its buckets with $inc upserts, so reading a time series costs one
+    indexed range scan over buckets, however many status checks they count. If the
+    rollups ever drift (e.g. a bump failed after its insert succeeded), rebuild()
+    recounts a time range from the status_checks collection.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("granularity", 1), ("bucket", 1), ("client_name", 1)],
+            unique=True,
+            name="granularity_bucket_client",
+        )
+
+    async def record(self, status_checks: Iterable[Dict[str, Any]]):
+        """Count newly inserted status checks into their minute and hour buckets"""
+        from pymongo import UpdateOne
+
+        counts: Counter = Counter()
+        for status_check in status_checks:
+            for granularity in GRANULARITIES:
+                bucket = bucket_start(status_check["timestamp"], granularity)
+                counts[(granularity, status_check["client_name"], bucket)] += 1
+        if not counts:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"granularity": granularity, "bucket": bucket, "client_name": client_name},
+                    {"$inc": {"count": count}},
+                    upsert=True,
+                )
+                for (granularity, client_name, bucket), count in counts.items()
+            ],
+            ordered=False,
+        )
+
+    async def series(
+        self,
+        granularity: str,
+        since: datetime,
+        until: datetime,
+        client_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Counts for buckets starting in [since, until), oldest first"""
+        query: Dict[str, Any] = {"granularity": granularity, "bucket": {"$gte": since, "$lt": until}}
+        if client_name is not None:
+            query["client_name"] = client_name
+        cursor = self.collection.find(query, {"_id": 0, "granularity": 0}).sort([("bucket", 1), ("client_name", 1)])
+        return await cursor.to_list(None)
+
+    async def rebuild(
+        self,
+        status_collection,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        retained_only: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Recount every bucket between since and until (widened to whole hours) from the
+        status checks themselves, replacing what the rollups held. Unbounded ends cover
+        the whole collection. Checks written to those buckets while this runs may be
+        counted twice or not at all, so prefer ranges that are no longer being written.
+        Returns the number of buckets written per granularity.
+
+        With retained_only (status checks expire after a retention period), since is
+        moved up to the first whole hour still fully held in status_checks, so the
+        rollups are the only record of older hours and are left alone.
+        """
+        from pymongo import UpdateOne
+
+        since = bucket_start(since, "hour") if since else None
+        if until and until != bucket_start(until, "hour"):
+            until = bucket_start(until, "hour") + timedelta(hours=1)
+        if retained_only:
+            oldest = await status_collection.find_one({}, {"_id": 0, "timestamp": 1}, sort=[("timestamp", 1)])
+            if oldest is None:
+                return {granularity: 0 for granularity in GRANULARITIES}
+            # The oldest check's hour may already have lost some checks to expiry
+            first_hour = bucket_start(oldest["timestamp"], "hour") + timedelta(hours=1)
+            since = max(since, first_hour) if since else first_hour
+            if until and until <= since:
+                return {granularity: 0 for granularity in GRANULARITIES}
+        time_range: Dict[str, datetime] = {}
+        if since:
+            time_range["$gte"] = since
+        if until:
+            time_range["$lt"] = until
+
+        written = {}
+        for granularity in GRANULARITIES:
+            pipeline: List[Dict[str, Any]] = []
+            if time_range:
+                pipeline.append({"$match": {"timestamp": time_range}})
+            pipeline.append({
+                "$group": {
+                    "_id": {"client_name": "$client_name", "bucket": _bucket_expression(granularity)},
+                    "count": {"$sum": 1},
+                }
+            })
+            counts = await status_collection.aggregate(pipeline).to_list(None)
+
+            stale: Dict[str, Any] = {"granularity": granularity}
+            if time_range:
+                stale["bucket"] = time_range
+            await self.collection.delete_many(stale)
+            if counts:
+                await self.collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {"granularity": granularity, **row["_id"]},
+                            {"$set": {"count": row["count"]}},
+                            upsert=True,
+                        )
+                        for row in counts
+                    ],
+                    ordered=False,
+                )
+            written[granularity] = len(counts)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="recount the rollups from status_checks")
+    rebuild.add_argument("--since", type=datetime.fromisoformat, help="start of the range (ISO 8601, UTC if no offset)")
+    rebuild.add_argument("--until", type=datetime.fromisoformat, help="end of the range (ISO 8601, UTC if no offset)")
+    args = parser.parse_args()
+
+    import server
+    from settings import Settings
+    from structured_logging import configure_logging
+
+    settings = Settings.from_env()
+    configure_logging(settings)
+    services = server.Services(settings)
+
+    async def run():
+        try:
+            written = await services.status_rollups.rebuild(
+                services.db.status_checks,
+                server.as_naive_utc(args.since),
+                server.as_naive_utc(args.until),
+                retained_only=services.settings.status_retention_days is not None,
+            )
+            print(f"Rebuilt {written['minute']} minute and {written['hour']} hour buckets")
+        finally:
+            await services.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,143 +1,261 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Header, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from fastapi.responses import ORJSONResponse
+from starlette.responses import StreamingResponse, PlainTextResponse, JSONResponse
+import asyncio
+import time
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uuid
-from datetime import datetime
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from functools import cached_property, partial
 
-# Import email functions
-import resend
-from typing import Dict, Any
+from archive import MIN_RETENTION_DAYS, StatusArchiver
+from compression import CompressionMiddleware, ResponseCompressor, gzip_compressor
+from dedup import DedupStore, content_hash
+from frontend import StaticFrontend
+import metrics
+from metrics import MetricsMiddleware
+from notifications import NOTIFICATION_MODES, Notifier
+from outbox import NotificationOutbox
+from profiler import ProfilerMiddleware, SamplingProfiler
+from response_cache import ResponseCache
+from rate_limit import RateLimitMiddleware, RateLimitRule, buckets_from_settings
+from rollups import GRANULARITIES, StatusRollups
+from settings import Settings
+from structured_logging import RequestIdMiddleware, configure_logging
+from write_buffer import WriteBehindBuffer, WriteBufferFull
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Initialize Resend
-resend.api_key = os.getenv("RESEND_API_KEY")
+logger = logging.getLogger(__name__)
 
-def send_assessment_notification(form_data: Dict[str, Any]) -> bool:
-    """Send email notification for assessment form submission"""
-    try:
-        html_content = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
-                        🎯 New Free Assessment Request - Collective Vox
-                    </h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0; color: #333;">Contact Information</h3>
-                        <p><strong>Name:</strong> {form_data.get('name', 'Not provided')}</p>
-                        <p><strong>Email:</strong> {form_data.get('email', 'Not provided')}</p>
-                    </div>
-                    
-                    <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0; color: #333;">Professional Details</h3>
-                        <p><strong>Industry:</strong> {form_data.get('industry', 'Not provided')}</p>
-                        <p><strong>Job Title:</strong> {form_data.get('jobTitle', 'Not provided')}</p>
-                    </div>
-                    
-                    <div style="background-color: #d1ecf1; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0; color: #333;">Key Challenges</h3>
-                        <p style="background-color: white; padding: 15px; border-radius: 4px; border-left: 4px solid #ff6b35;">
-                            {form_data.get('keyChallenges', 'Not provided')}
-                        </p>
-                    </div>
-                    
-                    <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
-                        <p style="margin: 0; font-size: 14px; color: #666;">
-                            This assessment request was submitted through collectivevox.app
-                        </p>
-                        <p style="margin: 5px 0 0 0; font-size: 14px; color: #666;">
-                            Submitted at: {form_data.get('submitted_at', 'Unknown')}
-                        </p>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
-        
-        params = {
-            "from": "Collective Vox <onboarding@resend.dev>",
-            "to": ["collectivevox@gmail.com"],
-            "subject": f"🎯 New Assessment Request from {form_data.get('name', 'Unknown')} - Collective Vox",
-            "html": html_content,
-        }
-        
-        email = resend.Emails.send(params)
-        print(f"Assessment notification sent successfully: {email}")
-        return True
-        
-    except Exception as e:
-        print(f"Error sending assessment notification: {str(e)}")
-        return False
+# MongoDB connection, with the pool tuned from settings
+def mongo_client_options(settings: Settings) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+    }
+    if settings.mongo_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongo_max_idle_time_ms
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    return options
 
-def send_contact_notification(form_data: Dict[str, Any]) -> bool:
-    """Send email notification for contact form submission"""
-    try:
-        html_content = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #ff6b35; border-bottom: 2px solid #ff6b35; padding-bottom: 10px;">
-                        💬 New Contact Inquiry - Collective Vox
-                    </h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0; color: #333;">Contact Information</h3>
-                        <p><strong>Name:</strong> {form_data.get('name', 'Not provided')}</p>
-                        <p><strong>Email:</strong> {form_data.get('email', 'Not provided')}</p>
-                    </div>
-                    
-                    <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0; color: #333;">Message</h3>
-                        <p style="background-color: white; padding: 15px; border-radius: 4px; border-left: 4px solid #ff6b35; white-space: pre-wrap;">
-                            {form_data.get('message', 'No message provided')}
-                        </p>
-                    </div>
-                    
-                    <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
-                        <p style="margin: 0; font-size: 14px; color: #666;">
-                            This contact inquiry was submitted through collectivevox.app
-                        </p>
-                        <p style="margin: 5px 0 0 0; font-size: 14px; color: #666;">
-                            Submitted at: {form_data.get('submitted_at', 'Unknown')}
-                        </p>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
-        
-        params = {
-            "from": "Collective Vox <onboarding@resend.dev>",
-            "to": ["collectivevox@gmail.com"],
-            "subject": f"💬 New Contact from {form_data.get('name', 'Unknown')} - Collective Vox",
-            "html": html_content,
-        }
-        
-        email = resend.Emails.send(params)
-        print(f"Contact notification sent successfully: {email}")
-        return True
-        
-    except Exception as e:
-        print(f"Error sending contact notification: {str(e)}")
-        return False
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+class Services:
+    """
+    Clients and components shared by the routes of one app.
+
+    Each is built on first use, so creating the app imports neither motor/pymongo nor
+    httpx and needs no MONGO_URL; they are paid for at startup or on the first request
+    that touches them. Pass mongo_client to run against another client (e.g. a test
+    double) instead of one built from settings.
+    """
+
+    def __init__(self, settings: Settings, mongo_client=None):
+        self.settings = settings
+        self.mongo_options = mongo_client_options(settings)
+        # Flipped once startup (pool warmup, indexes, workers) has finished; gates /api/health/ready
+        self.ready = False
+        self._startup_task: Optional[asyncio.Task] = None
+        if mongo_client is not None:
+            self.__dict__["client"] = mongo_client
+
+    @cached_property
+    def mongo_pool_metrics(self):
+        from mongo_metrics import MongoPoolMetrics
+        return MongoPoolMetrics()
+
+    @cached_property
+    def client(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from mongo_metrics import MongoCommandMetrics
+        if not self.settings.mongo_url:
+            raise RuntimeError("MONGO_URL is not configured")
+        return AsyncIOMotorClient(
+            self.settings.mongo_url,
+            event_listeners=[MongoCommandMetrics(), self.mongo_pool_metrics],
+            **self.mongo_options,
+        )
+
+    @cached_property
+    def db(self):
+        if not self.settings.db_name:
+            raise RuntimeError("DB_NAME is not configured")
+        return self.client[self.settings.db_name]
+
+    @cached_property
+    def email_transport(self):
+        # Resend, pooled SMTP or a local sink, by EMAIL_TRANSPORT
+        from email_transport import transport_from_settings
+        return transport_from_settings(self.settings, ROOT_DIR)
+
+    @cached_property
+    def notifier(self) -> Notifier:
+        # Renders form notifications and decides who receives them
+        return Notifier.from_settings(self.settings, self.email_transport)
+
+    @cached_property
+    def outbox(self) -> NotificationOutbox:
+        # Form notifications are queued in Mongo and drained by async workers
+        return NotificationOutbox.from_settings(
+            self.settings,
+            self.db.notification_outbox,
+            self.notifier.handlers(),
+            batch_handler=self.notifier.batch_handler(self.settings.notification_mode),
+        )
+
+    @cached_property
+    def dedup_store(self) -> DedupStore:
+        # Repeated submissions (double clicks, client retries) are answered without queuing again
+        collection = self.db.notification_dedup if self.settings.dedup_backend == "mongo" else None
+        return DedupStore.from_settings(self.settings, collection)
+
+    @cached_property
+    def compressor(self) -> Optional[ResponseCompressor]:
+        # Shared by the compression middleware and the response cache's memoized variants
+        if not self.settings.compression_enabled:
+            return None
+        return ResponseCompressor.from_settings(self.settings)
+
+    @cached_property
+    def response_cache(self) -> ResponseCache:
+        # Serialized responses for the polled read endpoints, invalidated on status writes,
+        # along with their compressed variants
+        return ResponseCache.from_settings(self.settings, self.compressor)
+
+    @cached_property
+    def status_rollups(self) -> StatusRollups:
+        # Per-client minute/hour counts, bumped on every status check write
+        return StatusRollups(self.db.status_rollups)
+
+    @cached_property
+    def status_archiver(self) -> StatusArchiver:
+        # Retention on status_checks: each day is archived to disk, then deleted once expired
+        archive_dir = Path(self.settings.status_archive_dir)
+        return StatusArchiver(
+            self.db.status_checks,
+            archive_dir if archive_dir.is_absolute() else ROOT_DIR / archive_dir,
+            retention_days=self.settings.status_retention_days,
+            batch_size=self.settings.status_export_batch_size,
+            interval_seconds=self.settings.status_archive_interval_seconds,
+        )
+
+    @cached_property
+    def status_write_buffer(self) -> WriteBehindBuffer:
+        # Opt-in write-behind for POST /api/status (STATUS_WRITE_BEHIND)
+        settings = self.settings
+        collection = self.db.status_checks
+        if settings.status_write_concern_w is not None or settings.status_write_concern_journal is not None:
+            from pymongo import WriteConcern
+            w = settings.status_write_concern_w
+            collection = collection.with_options(write_concern=WriteConcern(
+                w=int(w) if w is not None and w.isdigit() else w,
+                j=settings.status_write_concern_journal,
+            ))
+
+        async def on_flush(status_checks: List[Dict[str, Any]]):
+            await record_status_rollups(self, status_checks)
+            self.response_cache.invalidate("/api/status")
+
+        return WriteBehindBuffer(
+            collection,
+            max_items=settings.status_write_buffer_max_items,
+            flush_interval=settings.status_write_buffer_flush_interval_ms / 1000,
+            max_pending=settings.status_write_buffer_max_pending,
+            full_timeout=settings.status_write_buffer_full_timeout_seconds,
+            on_flush=on_flush,
+        )
+
+    @cached_property
+    def rate_limit_buckets(self):
+        collection = self.db.rate_limits if self.settings.rate_limit_backend == "mongo" else None
+        return buckets_from_settings(self.settings, collection)
+
+    async def warm_up_mongo(self):
+        # Select a server and open connections before the first request has to pay for it
+        await self.client.admin.command("ping")
+        warm_connections = max(self.settings.mongo_min_pool_size, self.settings.mongo_warmup_connections)
+        await asyncio.gather(*(self.client.admin.command("ping") for _ in range(warm_connections)))
+
+    async def ensure_indexes(self):
+        # Back the keyset pagination in get_status_checks, unfiltered and per client
+        await self.db.status_checks.create_index(STATUS_SORT, name="timestamp_id_desc")
+        await self.db.status_checks.create_index([("client_name", 1)] + STATUS_SORT, name="client_timestamp_id_desc")
+        await self.status_archiver.ensure_indexes()
+        await self.status_rollups.ensure_indexes()
+        await self.outbox.ensure_indexes()
+        await self.dedup_store.ensure_indexes()
+        await self.rate_limit_buckets.ensure_indexes()
+
+    async def _start(self):
+        await self.warm_up_mongo()
+        await self.ensure_indexes()
+        self.outbox.start()
+        self.status_archiver.start()
+        if self.settings.status_write_behind:
+            self.status_write_buffer.start()
+        self.ready = True
+
+    async def _retry_start(self):
+        from pymongo.errors import ConnectionFailure
+
+        delay = self.settings.mongo_startup_retry_seconds
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._start()
+            except (ConnectionFailure, asyncio.TimeoutError) as e:
+                logger.error(f"Startup failed, retrying in {delay:g}s: {str(e)}")
+                continue
+            except Exception:
+                logger.exception("Startup failed, not retrying")
+                return
+            logger.info("Startup completed after retrying")
+            return
+
+    async def startup(self):
+        # Mongo being unreachable must not stop the process: it stays up, reports not
+        # ready on /api/health/ready and keeps retrying until startup completes. Any
+        # other error (e.g. bad credentials) fails startup, as retrying cannot fix it.
+        from pymongo.errors import ConnectionFailure
+
+        try:
+            await self._start()
+        except (ConnectionFailure, asyncio.TimeoutError) as e:
+            logger.error(f"Startup failed, retrying in the background: {str(e)}")
+            self._startup_task = asyncio.create_task(self._retry_start())
+
+    async def shutdown(self):
+        self.ready = False
+        if self._startup_task is not None:
+            self._startup_task.cancel()
+            await asyncio.gather(self._startup_task, return_exceptions=True)
+        # Only close what was actually built; buffered status checks are written first
+        if "status_write_buffer" in self.__dict__:
+            await self.status_write_buffer.stop()
+        if "outbox" in self.__dict__:
+            await self.outbox.stop()
+        if "status_archiver" in self.__dict__:
+            await self.status_archiver.stop()
+        if "email_transport" in self.__dict__:
+            await self.email_transport.aclose()
+        if "client" in self.__dict__:
+            self.client.close()
+
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
 
-# Create the main app without a prefix
-app = FastAPI()
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -152,6 +270,21 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class StatusCheckBatchResponse(BaseModel):
+    inserted: int
+    failed: int
+    results: List[StatusCheckBatchItemResult]
+
+class StatusCheckPage(BaseModel):
+    items: List[StatusCheck]
+    next_cursor: Optional[str] = None
+
 class EmailNotificationRequest(BaseModel):
     form_data: Dict[str, Any]
     form_type: str  # "assessment" or "contact"
@@ -163,29 +296,345 @@ class EmailResponse(BaseModel):
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
-async def root():
-    return {"message": "Hello World"}
+async def root(request: Request, services: Services = Depends(get_services)):
+    async def build():
+        return {"message": "Hello World"}
+    return await services.response_cache.respond(request, build)
+
+async def record_status_rollups(services: Services, status_checks: List[Dict[str, Any]]):
+    """Count written status checks into the rollups; a failure here must not fail the write"""
+    try:
+        await services.status_rollups.record(status_checks)
+    except Exception as e:
+        logger.error(f"Error updating status rollups, rebuild them with backend/rollups.py to recover: {str(e)}")
 
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(input: StatusCheckCreate, services: Services = Depends(get_services)):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    if services.settings.status_write_behind:
+        # Acknowledged once buffered; rollups and the cache are updated when the batch is written
+        try:
+            await services.status_write_buffer.add(status_obj.dict())
+        except WriteBufferFull as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Status check not accepted ({e}), please retry later",
+                headers={"Retry-After": "1"},
+            )
+        return status_obj
+    _ = await services.db.status_checks.insert_one(status_obj.dict())
+    await record_status_rollups(services, [status_obj.dict()])
+    services.response_cache.invalidate("/api/status")
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.post("/status/batch", response_model=StatusCheckBatchResponse)
+async def create_status_checks_batch(inputs: List[StatusCheckCreate], services: Services = Depends(get_services)):
+    """
+    Create many status checks with a single unordered insert_many.
+    One failing document does not stop the others; each item's outcome is reported by index.
+    """
+    from pymongo.errors import BulkWriteError
+
+    if not inputs:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one status check")
+    max_items = services.settings.status_batch_max_items
+    if len(inputs) > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the maximum of {max_items} status checks",
+        )
+
+    status_objs = [StatusCheck(**item.dict()) for item in inputs]
+    errors: Dict[int, str] = {}
+    try:
+        await services.db.status_checks.insert_many([obj.dict() for obj in status_objs], ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            errors[write_error["index"]] = write_error.get("errmsg", "Write failed")
+    await record_status_rollups(
+        services, [obj.dict() for i, obj in enumerate(status_objs) if i not in errors]
+    )
+    services.response_cache.invalidate("/api/status")
+
+    results = [
+        StatusCheckBatchItemResult(index=i, success=False, error=errors[i])
+        if i in errors
+        else StatusCheckBatchItemResult(index=i, success=True, id=obj.id)
+        for i, obj in enumerate(status_objs)
+    ]
+    return StatusCheckBatchResponse(
+        inserted=len(status_objs) - len(errors),
+        failed=len(errors),
+        results=results,
+    )
+
+# Status checks are paged newest-first on (timestamp, id), optionally within one client_name;
+# see ensure_indexes(). tests/test_status_query_plans.py checks both are index scans.
+STATUS_PAGE_DEFAULT_LIMIT = 100
+STATUS_PAGE_MAX_LIMIT = 1000
+STATUS_SORT = [("timestamp", -1), ("id", -1)]
+# Exactly the StatusCheck fields, so pages can be served without building models
+STATUS_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
+def encode_status_cursor(status_check: Dict[str, Any]) -> str:
+    """Encode the sort key of the last item on a page as an opaque cursor"""
+    raw = f"{status_check['timestamp'].isoformat()}|{status_check['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_status_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn a cursor back into a keyset filter for the next page"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp_str, status_id = raw.split("|", 1)
+        timestamp = datetime.fromisoformat(timestamp_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {
+        # Redundant with the $or, but gives the planner a single bounded range on the index
+        "timestamp": {"$lte": timestamp},
+        "$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": status_id}},
+        ],
+    }
+
+def status_query(
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Filter for one page of status checks: equality on client_name, then a timestamp range"""
+    since, until = as_naive_utc(since), as_naive_utc(until)
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    query: Dict[str, Any] = {}
+    if client_name is not None:
+        query["client_name"] = client_name
+    if since is not None or until is not None:
+        query["timestamp"] = {}
+        if since is not None:
+            query["timestamp"]["$gte"] = since
+        if until is not None:
+            query["timestamp"]["$lt"] = until
+    if after:
+        keyset = decode_status_cursor(after)
+        query.setdefault("timestamp", {}).update(keyset.pop("timestamp"))
+        query.update(keyset)
+    return query
+
+@api_router.get("/status", response_model=StatusCheckPage, response_class=ORJSONResponse)
+async def get_status_checks(
+    request: Request,
+    limit: int = Query(STATUS_PAGE_DEFAULT_LIMIT, ge=1, le=STATUS_PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    services: Services = Depends(get_services),
+):
+    """
+    Return one page of status checks, newest first, optionally only those of one
+    client_name and/or with since <= timestamp < until.
+    Pass the returned next_cursor as `after` (with the same filters) to fetch the following page.
+    Pages are cached briefly and carry an ETag, so polling clients can revalidate with If-None-Match.
+
+    Documents are projected to the StatusCheck fields and encoded straight to JSON with
+    orjson; StatusCheckPage only documents the shape, no model is built per document.
+    """
+    query = status_query(client_name, since, until, after)
+
+    async def build():
+        # Fetch one extra document to know whether another page exists
+        status_checks = await (
+            services.db.status_checks.find(query, STATUS_PROJECTION).sort(STATUS_SORT).limit(limit + 1).to_list(limit + 1)
+        )
+        next_cursor = None
+        if len(status_checks) > limit:
+            status_checks = status_checks[:limit]
+            next_cursor = encode_status_cursor(status_checks[-1])
+        return {"items": status_checks, "next_cursor": next_cursor}
+    return await services.response_cache.respond(request, build)
+
+# Widest window /status/rollups serves at once, in buckets (a week of minutes)
+STATUS_ROLLUP_MAX_BUCKETS = 7 * 24 * 60
+STATUS_ROLLUP_DEFAULT_BUCKETS = 60
+
+def as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert timezone-aware query values to match"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def rollup_window(granularity: str, since: Optional[datetime], until: Optional[datetime]):
+    since, until = as_naive_utc(since), as_naive_utc(until)
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    bucket_seconds = GRANULARITIES[granularity]
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(seconds=bucket_seconds * STATUS_ROLLUP_DEFAULT_BUCKETS)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if (until - since).total_seconds() / bucket_seconds > STATUS_ROLLUP_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window exceeds {STATUS_ROLLUP_MAX_BUCKETS} {granularity} buckets; narrow since/until",
+        )
+    return since, until
+
+@api_router.get("/status/rollups", response_class=ORJSONResponse)
+async def get_status_rollups(
+    request: Request,
+    granularity: str = "minute",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    services: Services = Depends(get_services),
+):
+    """
+    Status check counts per client_name per minute or hour bucket, oldest first.
+    Defaults to the last 60 buckets. Served from the rollups, so the cost grows with
+    the number of buckets, not the number of status checks.
+    """
+    since, until = rollup_window(granularity, since, until)
+
+    async def build():
+        points = await services.status_rollups.series(granularity, since, until, client_name)
+        return {"granularity": granularity, "since": since, "until": until, "points": points}
+    return await services.response_cache.respond(request, build)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(services: Services = Depends(get_services)):
+    """
+    Prometheus text exposition of request, Mongo, email provider and outbox metrics.
+    The outbox gauges are read from Mongo; if that fails or is slow they keep their
+    last values, so a database incident never costs the rest of the metrics.
+    """
+    try:
+        outbox_stats = await asyncio.wait_for(services.outbox.stats(), services.settings.mongo_ping_timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(f"Outbox stats timed out after {services.settings.mongo_ping_timeout_seconds}s, serving the last values")
+    except Exception as e:
+        logger.warning(f"Could not read outbox stats, serving the last values: {str(e)}")
+    else:
+        metrics.notification_queue_depth.set(outbox_stats["queue_depth"])
+        metrics.notification_oldest_job_age.set(outbox_stats["oldest_job_age_seconds"])
+        metrics.notification_failed_jobs.set(outbox_stats["failed"])
+        metrics.notification_parked_jobs.set(outbox_stats["parked"])
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/health/ready")
+async def readiness(services: Services = Depends(get_services)):
+    """
+    Readiness probe: 200 once startup finished and Mongo answers a ping, 503 otherwise.
+    Reports ping latency and connection pool utilization.
+    """
+    pool_metrics = services.mongo_pool_metrics
+    max_pool_size = services.mongo_options["maxPoolSize"]
+    pool = {
+        "open": pool_metrics.open,
+        "in_use": pool_metrics.in_use,
+        "max_size": max_pool_size,
+        "utilization": pool_metrics.in_use / max_pool_size if max_pool_size else 0.0,
+    }
+    start = time.perf_counter()
+    try:
+        # Bounded well below serverSelectionTimeoutMS, so probes get a 503 rather than time out
+        await asyncio.wait_for(
+            services.client.admin.command("ping"), services.settings.mongo_ping_timeout_seconds
+        )
+        ping_ms = (time.perf_counter() - start) * 1000
+        db_error = None
+    except asyncio.TimeoutError:
+        ping_ms = None
+        db_error = f"ping timed out after {services.settings.mongo_ping_timeout_seconds}s"
+    except Exception as e:
+        ping_ms = None
+        db_error = str(e)
+
+    ready = services.ready and db_error is None
+    body = {"ready": ready, "startup_complete": services.ready, "db_ping_ms": ping_ms, "pool": pool}
+    if db_error:
+        body["db_error"] = db_error
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@api_router.get("/status/buffer/stats")
+async def get_status_buffer_stats(services: Services = Depends(get_services)):
+    """Write-behind buffer depth and flush counters (all zero unless STATUS_WRITE_BEHIND is on)"""
+    return services.status_write_buffer.stats()
+
+@api_router.get("/cache/stats")
+async def get_cache_stats(services: Services = Depends(get_services)):
+    """Response cache hit/miss counters"""
+    return services.response_cache.stats()
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def iter_status_ndjson(collection, compress: bool, batch_size: int):
+    """Yield the status_checks collection as NDJSON, one cursor batch at a time"""
+    cursor = collection.find({}, {"_id": 0}).batch_size(batch_size)
+    compressor = gzip_compressor() if compress else None
+    lines = []
+    async for status_check in cursor:
+        lines.append(json.dumps(status_check, default=_json_default))
+        if len(lines) >= batch_size:
+            chunk = ("\n".join(lines) + "\n").encode()
+            lines = []
+            yield compressor.compress(chunk) if compressor else chunk
+    if lines:
+        chunk = ("\n".join(lines) + "\n").encode()
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
+
+@api_router.get("/status/export")
+async def export_status_checks(gzip: bool = False, services: Services = Depends(get_services)):
+    """
+    Stream every status check as newline-delimited JSON.
+    Memory use is bounded by one cursor batch, whatever the collection size.
+    """
+    # gzip produces a .ndjson.gz file download, not a transparent Content-Encoding
+    filename = "status_checks.ndjson.gz" if gzip else "status_checks.ndjson"
+    return StreamingResponse(
+        iter_status_ndjson(services.db.status_checks, gzip, services.settings.status_export_batch_size),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @api_router.post("/send-form-notification", response_model=EmailResponse)
 async def send_form_notification(
-    request: EmailNotificationRequest, 
-    background_tasks: BackgroundTasks
+    request: EmailNotificationRequest,
+    idempotency_key: Optional[str] = Header(None),
+    services: Services = Depends(get_services),
 ):
     """
-    Send email notification for form submissions
+    Send email notification for form submissions.
+    A repeat of the same Idempotency-Key or the same form content within
+    DEDUP_WINDOW_SECONDS is acknowledged without queuing another email.
     """
+    if request.form_type not in ("assessment", "contact"):
+        raise HTTPException(status_code=400, detail="Invalid form type")
+    # Checked up front: an address outside NOTIFICATION_ALLOWED_RECIPIENTS is refused, not queued
+    try:
+        recipients = services.notifier.recipients_for(request.recipient_email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    dedup_keys = [
+        f"key:{idempotency_key}" if idempotency_key else None,
+        f"hash:{content_hash(request.form_type, request.form_data)}",
+    ]
+    if not await services.dedup_store.claim(dedup_keys):
+        return EmailResponse(
+            success=True,
+            message=f"Duplicate {request.form_type} submission ignored; notification already queued"
+        )
+
     try:
         # Add timestamp to form data
         form_data_with_timestamp = {
@@ -193,19 +642,11 @@ async def send_form_notification(
             "submitted_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
         }
         
-        # Send appropriate email based on form type
-        if request.form_type == "assessment":
-            background_tasks.add_task(
-                send_assessment_notification,
-                form_data_with_timestamp
-            )
-        elif request.form_type == "contact":
-            background_tasks.add_task(
-                send_contact_notification,
-                form_data_with_timestamp
-            )
-        else:
-            raise HTTPException(status_code=400, detail="Invalid form type")
+        # Persist to the outbox; a worker sends the matching email for the form type
+        await services.outbox.enqueue(
+            request.form_type,
+            services.notifier.payload_for(form_data_with_timestamp, recipients),
+        )
         
         return EmailResponse(
             success=True,
@@ -213,11 +654,12 @@ async def send_form_notification(
         )
         
     except Exception as e:
+        await services.dedup_store.release(dedup_keys)
         logger.error(f"Error sending form notification: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to send notification: {str(e)}")
 
 @api_router.post("/test-email")
-async def test_email(background_tasks: BackgroundTasks):
+async def test_email(services: Services = Depends(get_services)):
     """
     Test endpoint to verify email functionality
     """
@@ -229,13 +671,7 @@ async def test_email(background_tasks: BackgroundTasks):
             "submitted_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
         }
         
-        # Replace with your actual Gmail address
-        recipient_email = "collectivevox@gmail.com"
-        
-        background_tasks.add_task(
-            send_contact_notification,
-            test_data
-        )
+        await services.outbox.enqueue("contact", services.notifier.payload_for(test_data))
         
         return {"message": "Test email queued successfully"}
         
@@ -243,24 +679,98 @@ async def test_email(background_tasks: BackgroundTasks):
         logger.error(f"Error sending test email: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to send test email: {str(e)}")
 
-# Include the router in the main app
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+@api_router.get("/email/circuit")
+async def get_email_circuit(services: Services = Depends(get_services)):
+    """State of the circuit breaker around the email provider"""
+    return services.email_transport.breaker.stats()
+
+@api_router.get("/outbox/stats")
+async def get_outbox_stats(services: Services = Depends(get_services)):
+    """Queue depth and age of the oldest unsent notification"""
+    return await services.outbox.stats()
+
+# Token buckets for the unauthenticated write endpoints: (burst, refill/s) per client IP, then per route
+RATE_LIMIT_RULES = {
+    ("POST", "/api/send-form-notification"): RateLimitRule(5, 5 / 60, 200, 20),
+    ("POST", "/api/test-email"): RateLimitRule(2, 1 / 60, 10, 1),
+    ("POST", "/api/status"): RateLimitRule(60, 10, 2000, 500),
+    ("POST", "/api/status/batch"): RateLimitRule(10, 2, 200, 50),
+}
+
+def create_app(settings: Optional[Settings] = None, mongo_client=None) -> FastAPI:
+    """
+    Build the FastAPI app. Settings default to the environment (see settings.py);
+    clients are created lazily by the app's Services, not here.
+    """
+    settings = settings or Settings.from_env()
+    if settings.notification_mode not in NOTIFICATION_MODES:
+        raise ValueError(f"Unknown NOTIFICATION_MODE {settings.notification_mode!r}")
+    if settings.status_retention_days is not None and settings.status_retention_days < MIN_RETENTION_DAYS:
+        raise ValueError(f"STATUS_RETENTION_DAYS must be at least {MIN_RETENTION_DAYS} so days are archived before they expire")
+    services = Services(settings, mongo_client)
+
+    # Create the main app without a prefix
+    app = FastAPI()
+    app.state.services = services
+    # Logging is queued and written as JSON lines by a background thread. Set up when the
+    # server starts rather than here, so importing this module leaves logging alone.
+    app.add_event_handler("startup", partial(configure_logging, settings))
+
+    # Include the router in the main app
+    app.include_router(api_router)
+
+    if settings.frontend_build_dir:
+        # Mounted after the API routes, so it only sees requests none of them matched
+        build_dir = Path(settings.frontend_build_dir)
+        frontend = StaticFrontend(
+            build_dir if build_dir.is_absolute() else ROOT_DIR / build_dir,
+            compressor=services.compressor,
+            precompress=settings.frontend_precompress,
+        )
+        app.mount("/", frontend, name="frontend")
+        app.add_event_handler("startup", frontend.prepare)
+
+    if services.compressor is not None:
+        app.add_middleware(CompressionMiddleware, compressor=services.compressor)
+
+    if settings.rate_limit_enabled:
+        app.add_middleware(
+            RateLimitMiddleware,
+            rules=RATE_LIMIT_RULES,
+            get_buckets=lambda: services.rate_limit_buckets,
+            trusted_proxies=settings.rate_limit_trusted_proxies,
+            store_timeout=settings.rate_limit_store_timeout_seconds,
+        )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.profiler_enabled:
+        profiler_dir = Path(settings.profiler_dir)
+        profiler = SamplingProfiler(
+            profiler_dir if profiler_dir.is_absolute() else ROOT_DIR / profiler_dir,
+            slow_ms=settings.profiler_slow_ms,
+            sample_rate=settings.profiler_sample_rate,
+            interval=settings.profiler_interval_ms / 1000,
+            max_files=settings.profiler_max_files,
+            output_format=settings.profiler_format,
+        )
+        app.state.profiler = profiler
+        app.add_middleware(ProfilerMiddleware, profiler=profiler)
+        app.add_event_handler("shutdown", profiler.stop)
+
+    # Added last so it is outermost and also times rate-limited and CORS preflight requests
+    app.add_middleware(MetricsMiddleware)
+    # Outside even that, so everything logged while serving a request carries its id
+    app.add_middleware(RequestIdMiddleware)
+
+    app.add_event_handler("startup", services.startup)
+    app.add_event_handler("shutdown", services.shutdown)
+    return app
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+app = create_app()
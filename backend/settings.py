@@ -0,0 +1,131 @@
+import os
+from typing import Mapping, Optional
+
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    """
+    Backend configuration. Every field can be set from the environment variable of
+    the same name in upper case, e.g. mongo_max_pool_size <- MONGO_MAX_POOL_SIZE.
+    """
+
+    # Logging: queued and written by a background thread
+    log_level: str = "INFO"
+    log_format: str = "json"  # or "text"
+    log_queue_size: int = 10000  # records beyond this are dropped rather than block
+    log_sample_rates: Optional[str] = None  # e.g. "httpx=0.1,outbox=0.5"; warnings are always kept
+
+    # MongoDB
+    mongo_url: Optional[str] = None
+    db_name: Optional[str] = None
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: Optional[int] = None
+    mongo_server_selection_timeout_ms: int = 30000
+    mongo_compressors: Optional[str] = None  # e.g. "zstd,snappy,zlib"; zstd/snappy need extra packages
+    mongo_warmup_connections: int = 1
+    mongo_ping_timeout_seconds: float = 2.0  # readiness probe and outbox stats on /api/metrics
+    mongo_startup_retry_seconds: float = 5.0  # between startup attempts while Mongo is unreachable
+
+    # Email provider
+    email_transport: str = "resend"  # "resend", "smtp", "file" or "memory"
+    email_from: str = "Collective Vox <onboarding@resend.dev>"
+    notification_recipients: str = "collectivevox@gmail.com"  # comma-separated
+    # recipient_email values a request may choose, comma-separated ("*" for any);
+    # unset allows only notification_recipients
+    notification_allowed_recipients: Optional[str] = None
+    resend_api_key: Optional[str] = None
+    resend_api_url: str = "https://api.resend.com"
+    email_max_connections: int = 10
+    email_max_concurrency: int = 10
+    email_timeout: float = 10.0
+    email_max_retries: int = 2
+    email_retry_base_seconds: float = 0.2
+    email_retry_max_seconds: float = 2.0
+    email_circuit_failure_threshold: int = 5
+    email_circuit_reset_seconds: float = 30.0
+    smtp_host: Optional[str] = None
+    smtp_port: int = 587
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_starttls: bool = True
+    smtp_ssl: bool = False  # implicit TLS, usually port 465
+    smtp_idle_timeout_seconds: float = 60.0
+    email_sink_path: str = "email_sink.jsonl"  # for the file transport; relative to the backend directory
+
+    # Notification outbox
+    notification_mode: str = "single"  # "single", "digest" or "batch"
+    outbox_workers: int = 2
+    outbox_poll_interval: float = 1.0
+    outbox_lease_seconds: float = 300.0
+    outbox_max_attempts: int = 5
+    outbox_retry_backoff_seconds: float = 30.0
+    outbox_batch_max_items: int = 50
+    outbox_batch_window_seconds: float = 5.0
+
+    # Submission deduplication
+    dedup_window_seconds: float = 600.0
+    dedup_max_entries: int = 10000
+    dedup_backend: str = "memory"  # or "mongo"
+
+    # Rate limiting. Off by default: behind a reverse proxy every client shares the proxy's
+    # address, so set rate_limit_trusted_proxies to match the deployment before enabling it
+    rate_limit_enabled: bool = False
+    rate_limit_backend: str = "memory"  # or "mongo"
+    rate_limit_max_buckets: int = 100000
+    rate_limit_idle_ttl_seconds: int = 3600
+    # Reverse proxies in front of the app; clients are told apart by the X-Forwarded-For
+    # entry the outermost one appended. 0 uses the connecting address.
+    rate_limit_trusted_proxies: int = 0
+    rate_limit_store_timeout_seconds: float = 0.5  # past this (or on error) requests are let through
+
+    # Response cache
+    response_cache_ttl_seconds: float = 5.0
+    response_cache_max_entries: int = 256
+
+    # Response compression: brotli (if installed) or gzip, by Accept-Encoding
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_content_types: str = "application/json,application/x-ndjson,text/"  # prefixes
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Frontend: serve a production build (e.g. "../frontend/build") from this app
+    frontend_build_dir: Optional[str] = None  # relative to the backend directory; unset to not serve it
+    frontend_precompress: bool = True  # write .br/.gz siblings into the build at startup
+
+    # Status checks
+    status_batch_max_items: int = 1000
+    status_export_batch_size: int = 1000
+    status_retention_days: Optional[float] = None  # unset keeps status checks forever
+    status_archive_dir: str = "archive"  # relative to the backend directory
+    status_archive_interval_seconds: float = 3600.0
+
+    # Write-behind for POST /api/status: acknowledge once buffered, insert in batches
+    status_write_behind: bool = False
+    status_write_buffer_max_items: int = 500
+    status_write_buffer_flush_interval_ms: float = 50.0
+    status_write_buffer_max_pending: int = 10000
+    status_write_buffer_full_timeout_seconds: float = 1.0
+    status_write_concern_w: Optional[str] = None  # e.g. "1" or "majority"; server default if unset
+    status_write_concern_journal: Optional[bool] = None
+
+    # Request profiler: samples stacks of slow (or randomly picked) requests to disk
+    profiler_enabled: bool = False
+    profiler_slow_ms: Optional[float] = 500.0  # unset to only profile sampled requests
+    profiler_sample_rate: float = 0.0
+    profiler_interval_ms: float = 5.0
+    profiler_dir: str = "profiles"  # relative to the backend directory
+    profiler_max_files: int = 100
+    profiler_format: str = "speedscope"  # or "collapsed"
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values = {
+            name: environ[name.upper()]
+            for name in cls.model_fields
+            if environ.get(name.upper()) not in (None, "")
+        }
+        return cls(**values)
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Called with the documents of each batch that reached Mongo, e.g. to update rollups
+FlushCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class WriteBufferFull(Exception):
+    """Raised when a document cannot be buffered: still full after the backpressure timeout, or not running"""
+
+
+class WriteBehindBuffer:
+    """
+    In-process buffer turning many small inserts into few insert_many calls.
+
+    add() returns as soon as the document is queued. A single flusher task writes the
+    queue with an unordered insert_many once it holds max_items documents or its
+    oldest document has waited flush_interval seconds. Callers that find max_pending
+    documents already queued wait for room, up to full_timeout seconds, and then get
+    WriteBufferFull, so a slow database pushes back on clients instead of growing
+    memory without bound.
+
+    A batch that fails as a whole (e.g. the database is unreachable) is put back and
+    retried with backoff; documents rejected individually are logged and dropped.
+    Documents are only accepted between start() and stop(), and stop() writes
+    everything still queued before returning. Documents queued in a process that dies
+    before flushing are lost; that is the trade-off of write-behind.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_items: int = 500,
+        flush_interval: float = 0.05,
+        max_pending: int = 10000,
+        full_timeout: float = 1.0,
+        retry_backoff_seconds: float = 0.5,
+        on_flush: Optional[FlushCallback] = None,
+    ):
+        self.collection = collection
+        self.max_items = max_items
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.full_timeout = full_timeout
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.on_flush = on_flush
+        self._pending: List[Dict[str, Any]] = []
+        self._oldest_at = 0.0
+        self._has_items = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    async def add(self, document: Dict[str, Any]):
+        if self._stopping:
+            raise WriteBufferFull("Write buffer is shutting down")
+        if self._task is None:
+            # Nothing would write it, nor flush it on shutdown (e.g. startup is still retrying)
+            raise WriteBufferFull("Write buffer is not running")
+        while len(self._pending) >= self.max_pending:
+            self._has_room.clear()
+            try:
+                await asyncio.wait_for(self._has_room.wait(), self.full_timeout)
+            except asyncio.TimeoutError:
+                raise WriteBufferFull(f"{len(self._pending)} writes already pending")
+        if not self._pending:
+            self._oldest_at = time.monotonic()
+        self._pending.append(document)
+        metrics.status_write_buffer_pending.set(len(self._pending))
+        self._has_items.set()
+        if len(self._pending) >= self.max_items:
+            self._batch_ready.set()
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for the next batch to be due; an empty batch means the buffer is stopping"""
+        if not self._stopping:
+            await self._has_items.wait()
+        if not self._pending:
+            return []
+        wait = self._oldest_at + self.flush_interval - time.monotonic()
+        if wait > 0 and len(self._pending) < self.max_items and not self._stopping:
+            self._batch_ready.clear()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        batch, self._pending = self._pending[:self.max_items], self._pending[self.max_items:]
+        if self._pending:
+            self._oldest_at = time.monotonic()
+        else:
+            self._has_items.clear()
+        return batch
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch; returns the documents that were written"""
+        from pymongo.errors import BulkWriteError
+
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            return batch
+        except BulkWriteError as e:
+            rejected = {error["index"] for error in e.details.get("writeErrors", [])}
+            self.failed += len(rejected)
+            metrics.status_write_buffer_documents.inc("rejected", amount=len(rejected))
+            logger.error(f"Write buffer dropped {len(rejected)} of {len(batch)} status checks: {e}")
+            return [document for i, document in enumerate(batch) if i not in rejected]
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                return
+            try:
+                written = await self._write(batch)
+            except Exception as e:
+                # Keep the batch (and therefore the backpressure) and try again shortly
+                self._pending[:0] = batch
+                self._has_items.set()
+                logger.error(f"Write buffer flush of {len(batch)} status checks failed, retrying: {e}")
+                await asyncio.sleep(self.retry_backoff_seconds)
+                continue
+            finally:
+                metrics.status_write_buffer_pending.set(len(self._pending))
+                if len(self._pending) < self.max_pending:
+                    self._has_room.set()
+            self.flushes += 1
+            self.written += len(written)
+            metrics.status_write_buffer_documents.inc("written", amount=len(written))
+            if written and self.on_flush is not None:
+                try:
+                    await self.on_flush(written)
+                except Exception as e:
+                    logger.error(f"Write buffer flush callback failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop accepting documents and wait, up to timeout seconds, for the rest to be written"""
+        if self._task is None:
+            return
+        self._stopping = True
+        # Wake the flusher: it writes what is left without waiting out flush_interval, then exits
+        self._has_items.set()
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Write buffer stopped with {len(self._pending)} status checks unwritten")
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "average_batch": self.written / self.flushes if self.flushes else 0.0,
+        }
@@ -96,9 +96,10 @@ def test_status_endpoints(base_url):
         response = requests.get(f"{base_url}/status", timeout=10)
         
         if response.status_code == 200:
-            status_list = response.json()
+            status_page = response.json()
             print("✅ GET /api/status working correctly")
             
+            status_list = status_page.get("items") if isinstance(status_page, dict) else None
             if isinstance(status_list, list):
                 print(f"✅ Retrieved {len(status_list)} status checks")
                 
@@ -115,7 +116,7 @@ def test_status_endpoints(base_url):
                     print("⚠️  Created status check not found in list (may be due to database state)")
                     return True  # Still consider this a pass as the endpoint works
             else:
-                print(f"❌ Expected list response, got: {type(status_list)}")
+                print(f"❌ Expected paginated response with items list, got: {status_page}")
                 return False
         else:
             print(f"❌ GET /api/status failed with status {response.status_code}")
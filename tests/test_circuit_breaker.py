@@ -0,0 +1,111 @@
+"""
+CircuitBreaker state transitions, and how EmailTransport feeds it: a half-open trial
+must end with an outcome however the call ends, or the circuit never closes again.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError  # noqa: E402
+from email_transport import EmailTransport, EmailTransportError  # noqa: E402
+
+RESET = 0.05
+
+
+class ScriptedTransport(EmailTransport):
+    """Each send runs the next scripted call: an exception to raise, or a result to return"""
+
+    def __init__(self, script):
+        super().__init__(max_retries=0, circuit_failure_threshold=1, circuit_reset_seconds=RESET)
+        self.script = list(script)
+
+    async def _call(self):
+        outcome = self.script.pop(0)
+        if outcome == "hang":
+            await asyncio.sleep(10)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def send(self, params):
+        return await self._with_retries(self._call)
+
+
+def open_then_half_open(breaker: CircuitBreaker):
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(RESET * 1.5)
+    assert breaker.state == HALF_OPEN
+
+
+def test_opens_after_threshold_and_half_opens_after_reset():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=RESET)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(RESET * 1.5)
+    assert breaker.state == HALF_OPEN
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=RESET)
+    open_then_half_open(breaker)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_released_trial_lets_the_next_one_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=RESET)
+    open_then_half_open(breaker)
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_unexpected_error_during_trial_reopens_the_circuit():
+    transport = ScriptedTransport([EmailTransportError("down"), ValueError("not JSON"), {"id": "1"}])
+
+    async def scenario():
+        with pytest.raises(EmailTransportError):
+            await transport.send({})
+        open_then_half_open(transport.breaker)
+        with pytest.raises(ValueError):
+            await transport.send({})
+        # Counted as a failed trial, not left in flight
+        assert transport.breaker.state == OPEN
+        await asyncio.sleep(RESET * 1.5)
+        assert await transport.send({}) == {"id": "1"}
+
+    asyncio.run(scenario())
+    assert transport.breaker.state == CLOSED
+
+
+def test_cancelled_trial_does_not_block_the_circuit():
+    transport = ScriptedTransport([EmailTransportError("down"), "hang", {"id": "1"}])
+
+    async def scenario():
+        with pytest.raises(EmailTransportError):
+            await transport.send({})
+        open_then_half_open(transport.breaker)
+        trial = asyncio.create_task(transport.send({}))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert await transport.send({}) == {"id": "1"}
+
+    asyncio.run(scenario())
+    assert transport.breaker.state == CLOSED
@@ -0,0 +1,147 @@
+"""
+DedupStore claims, in memory and shared through an in-memory Mongo (mongomock-motor),
+and how /api/send-form-notification uses them: a repeat under either key is answered
+as a duplicate, and a submission that could not be queued can be retried.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+httpx = pytest.importorskip("httpx")
+
+import dedup  # noqa: E402
+import server  # noqa: E402
+from dedup import DedupStore, content_hash  # noqa: E402
+from settings import Settings  # noqa: E402
+from tests.test_outbox import FlakyCollection  # noqa: E402
+
+RECIPIENT = "collectivevox@gmail.com"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic for the in-memory entries"""
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash("contact", {"a": 1, "b": 2}) == content_hash("contact", {"b": 2, "a": 1})
+    assert content_hash("contact", {"a": 1}) != content_hash("assessment", {"a": 1})
+
+
+def test_claim_release_and_expiry(clock):
+    store = DedupStore(window_seconds=60)
+
+    async def scenario():
+        results = [await store.claim(["key:1", "hash:a"])]
+        # A repeat under either key, or with a missing key, is a duplicate
+        results.append(await store.claim(["key:1", "hash:b"]))
+        results.append(await store.claim([None, "hash:a"]))
+        # Released keys can be claimed again
+        await store.release(["key:1", "hash:a", "hash:b"])
+        results.append(await store.claim(["key:1", "hash:a"]))
+        clock[0] += 59.9
+        results.append(await store.claim(["key:1"]))
+        clock[0] += 60
+        results.append(await store.claim(["key:1"]))
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, False, True, False, True]
+
+
+def test_local_entries_are_bounded(clock):
+    store = DedupStore(max_entries=2)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            assert await store.claim([key])
+        # "a" was evicted, so it is not recognised any more
+        return await store.claim(["a"]), await store.claim(["c"])
+
+    assert asyncio.run(scenario()) == (True, False)
+
+
+def test_shared_claims_across_processes():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.notification_dedup
+        first, second = DedupStore(collection=collection), DedupStore(collection=collection)
+        results = [await first.claim(["key:1"]), await second.claim(["key:1"])]
+        # Released by the process that claimed it, so another process may claim it
+        await first.release(["key:1"])
+        results.append(await DedupStore(collection=collection).claim(["key:1"]))
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_expired_shared_entry_is_taken_over():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.notification_dedup
+        # Expired, but not yet removed by the TTL monitor
+        await collection.insert_one({"_id": "key:1", "expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        await collection.insert_one({"_id": "key:2", "expires_at": datetime.utcnow() + timedelta(seconds=60)})
+        store = DedupStore(window_seconds=60, collection=collection)
+        expired, live = await store.claim(["key:1"]), await store.claim(["key:2"])
+        entry = await collection.find_one({"_id": "key:1"})
+        return expired, live, entry["expires_at"]
+
+    expired, live, expires_at = asyncio.run(scenario())
+    assert (expired, live) == (True, False)
+    assert expires_at > datetime.utcnow() + timedelta(seconds=50)
+
+
+async def submit(client, form_data, idempotency_key=None):
+    response = await client.post(
+        "/api/send-form-notification",
+        json={"form_type": "contact", "form_data": form_data, "recipient_email": RECIPIENT},
+        headers={"Idempotency-Key": idempotency_key} if idempotency_key else {},
+    )
+    return response.status_code, response.json().get("message", response.json().get("detail", ""))
+
+
+def make_app(dedup_backend: str):
+    settings = Settings(mongo_url="mongodb://localhost", db_name="test", resend_api_key="test", dedup_backend=dedup_backend)
+    return server.create_app(settings, mongo_client=mongomock_motor.AsyncMongoMockClient())
+
+
+@pytest.mark.parametrize("dedup_backend", ["memory", "mongo"])
+def test_same_content_under_a_new_idempotency_key_is_a_duplicate(dedup_backend):
+    async def scenario():
+        app = make_app(dedup_backend)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = [
+                await submit(client, {"name": "Ada", "message": "hi"}, "first"),
+                await submit(client, {"message": "hi", "name": "Ada"}, "second"),
+                await submit(client, {"name": "Ada", "message": "hello"}, "first"),
+            ]
+        return responses, await app.state.services.outbox.collection.count_documents({})
+
+    responses, queued = asyncio.run(scenario())
+    assert responses[0] == (200, "Email notification queued successfully for contact form")
+    assert all("Duplicate contact submission ignored" in message for _, message in responses[1:])
+    assert queued == 1
+
+
+@pytest.mark.parametrize("dedup_backend", ["memory", "mongo"])
+def test_retry_after_a_failed_enqueue_is_queued(dedup_backend):
+    async def scenario():
+        app = make_app(dedup_backend)
+        outbox = app.state.services.outbox
+        outbox.collection = FlakyCollection(outbox.collection, "insert_one")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await submit(client, {"name": "Ada"}, "only") for _ in range(3)]
+        return responses, await outbox.collection.count_documents({})
+
+    responses, queued = asyncio.run(scenario())
+    assert [status for status, _ in responses] == [500, 200, 200]
+    assert responses[1][1] == "Email notification queued successfully for contact form"
+    assert "Duplicate" in responses[2][1]
+    assert queued == 1
@@ -0,0 +1,189 @@
+"""
+NotificationOutbox workers against an in-memory Mongo (mongomock-motor): a failing
+collection call must not take a worker down with it.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from circuit_breaker import CircuitOpenError  # noqa: E402
+from email_transport import EmailTransportError, MemoryTransport  # noqa: E402
+from notifications import RECIPIENTS_KEY, Notifier  # noqa: E402
+from outbox import NotificationOutbox  # noqa: E402
+from structured_logging import request_id  # noqa: E402
+
+
+class FlakyCollection:
+    """Wraps a collection, making `failures` calls to one method raise after `after` succeed"""
+
+    def __init__(self, collection, method: str, failures: int = 1, after: int = 0):
+        self._collection = collection
+        self._method = method
+        self.failures = failures
+        # Successful calls to let through before failing
+        self.after = after
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name != self._method:
+            return attribute
+
+        async def call(*args, **kwargs):
+            if self.after > 0:
+                self.after -= 1
+            elif self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError(f"{name} failed")
+            return await attribute(*args, **kwargs)
+        return call
+
+
+async def drain(outbox: NotificationOutbox, timeout: float = 5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while (await outbox.stats())["pending"] and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def run_outbox(method: str, jobs: int, **options):
+    sent = []
+
+    async def send(payload):
+        sent.append(payload["n"])
+        return True
+
+    async def send_batch(batch):
+        sent.extend(job["payload"]["n"] for job in batch)
+        return True
+
+    async def scenario():
+        collection = FlakyCollection(mongomock_motor.AsyncMongoMockClient().db.outbox, method)
+        outbox = NotificationOutbox(
+            collection,
+            {"contact": send},
+            workers=1,
+            poll_interval=0.01,
+            batch_handler=send_batch if options.pop("batched", False) else None,
+            **options,
+        )
+        outbox.start()
+        try:
+            for n in range(jobs):
+                await outbox.enqueue("contact", {"n": n})
+                await asyncio.sleep(0.05)
+            await drain(outbox)
+            return collection.failures, await outbox.stats()
+        finally:
+            await outbox.stop()
+
+    failures_left, stats = asyncio.run(scenario())
+    assert failures_left == 0, f"{method} was never called"
+    return sent, stats
+
+
+def test_worker_survives_failure_completing_a_job():
+    sent, stats = run_outbox("delete_one", jobs=3)
+    # The first job went out but could not be deleted; the later ones still drain
+    assert sent == [0, 1, 2]
+    assert stats["pending"] == 0
+    assert stats["workers"] == 1
+
+
+def test_batch_worker_survives_failure_completing_a_batch():
+    sent, stats = run_outbox("delete_one", jobs=3, batched=True, batch_window_seconds=0.01)
+    assert sent == [0, 1, 2]
+    assert stats["pending"] == 0
+    assert stats["workers"] == 1
+
+
+def test_failed_claim_sends_the_jobs_already_claimed():
+    batches = []
+
+    async def send_batch(batch):
+        batches.append(([job["payload"]["n"] for job in batch], request_id.get()))
+        return True
+
+    async def scenario():
+        # The first claim and the one in the batch window succeed, the next one fails
+        collection = FlakyCollection(
+            mongomock_motor.AsyncMongoMockClient().db.outbox, "find_one_and_update", after=2
+        )
+        outbox = NotificationOutbox(
+            collection, {"contact": send_batch}, workers=1, poll_interval=0.01,
+            batch_handler=send_batch, batch_window_seconds=30,
+        )
+        for n in range(2):
+            token = request_id.set(f"req-{n}")
+            await outbox.enqueue("contact", {"n": n})
+            request_id.reset(token)
+        outbox.start()
+        try:
+            await asyncio.wait_for(drain_processing(outbox), 5)
+            return await outbox.stats()
+        finally:
+            await outbox.stop()
+
+    async def drain_processing(outbox):
+        while not batches or (await outbox.stats())["processing"]:
+            await asyncio.sleep(0.01)
+
+    stats = asyncio.run(scenario())
+    # Sent straight away, without waiting out the batch window or the lease
+    assert batches == [([0, 1], "req-0,req-1")]
+    assert stats["processing"] == 0 and stats["workers"] == 1
+
+
+class FailingForRecipient(MemoryTransport):
+    """Memory transport failing every email to one address with the given exception"""
+
+    def __init__(self, address: str, error: Exception):
+        super().__init__()
+        self.address = address
+        self.error = error
+
+    async def send(self, params):
+        if self.address in params["to"]:
+            raise self.error
+        return await super().send(params)
+
+
+def run_partial_batch(mode: str, error: Exception):
+    transport = FailingForRecipient("b@example.com", error)
+    notifier = Notifier(transport, recipients=["a@example.com"], allowed_recipients=["*"])
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.outbox
+        outbox = NotificationOutbox(
+            collection, notifier.handlers(), workers=1, batch_handler=notifier.batch_handler(mode)
+        )
+        for n, address in enumerate(["a@example.com", "a@example.com", "b@example.com"]):
+            await outbox.enqueue("contact", notifier.payload_for({"name": f"n{n}", "message": "hi"}, [address]))
+        jobs = []
+        while (job := await outbox.claim("worker")) is not None:
+            jobs.append(job)
+        await outbox.process_batch(jobs)
+        return await collection.find({}, {"_id": 0}).to_list(None)
+
+    return transport, asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("mode", ["digest", "batch"])
+def test_failed_recipient_group_does_not_resend_the_others(mode):
+    transport, remaining = run_partial_batch(mode, EmailTransportError("provider down"))
+    # a@'s submissions went out once and are done; only b@'s job is left, for a retry
+    assert transport.count == (1 if mode == "digest" else 2)
+    assert [job["payload"][RECIPIENTS_KEY] for job in remaining] == [["b@example.com"]]
+    assert remaining[0]["status"] == "pending" and not remaining[0].get("parked")
+
+
+@pytest.mark.parametrize("mode", ["digest", "batch"])
+def test_open_circuit_parks_only_the_unsent_jobs(mode):
+    transport, remaining = run_partial_batch(mode, CircuitOpenError("email_provider", 30))
+    assert [job["payload"][RECIPIENTS_KEY] for job in remaining] == [["b@example.com"]]
+    assert remaining[0]["parked"] and remaining[0]["attempts"] == 0
@@ -0,0 +1,161 @@
+"""
+Token buckets and RateLimitMiddleware: refill math, 429 Retry-After values, LRU
+eviction, which X-Forwarded-For entry identifies a client, and failing open when the
+bucket store errors.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import rate_limit  # noqa: E402
+from rate_limit import MemoryTokenBuckets, MongoTokenBuckets, RateLimitMiddleware, RateLimitRule  # noqa: E402
+
+ROUTE = ("POST", "/api/status")
+# Two requests per client, then one every 4 seconds; the route-wide bucket never runs out
+RULE = RateLimitRule(client_capacity=2, client_refill_per_second=0.25, route_capacity=1000, route_refill_per_second=1000)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic for MemoryTokenBuckets"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def acquire(buckets, key, capacity=2, refill_per_second=0.5):
+    return asyncio.run(buckets.acquire(key, capacity, refill_per_second))
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def request(middleware, client=("10.0.0.1", 1234), forwarded=(), method="POST", path="/api/status"):
+    """Run one request through the middleware; returns (status, headers)"""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded],
+        "client": client,
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+def limiter(buckets=None, trusted_proxies=0, store_timeout=0.5):
+    buckets = buckets or MemoryTokenBuckets()
+    return RateLimitMiddleware(
+        ok_app, {ROUTE: RULE}, lambda: buckets, trusted_proxies=trusted_proxies, store_timeout=store_timeout
+    )
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    buckets = MemoryTokenBuckets()
+    assert acquire(buckets, "a") == 0
+    assert acquire(buckets, "a") == 0
+    # Empty: one token takes 1 / 0.5 seconds to come back
+    assert acquire(buckets, "a") == pytest.approx(2.0)
+    clock[0] += 1.0
+    assert acquire(buckets, "a") == pytest.approx(1.0)
+    clock[0] += 1.0
+    assert acquire(buckets, "a") == 0
+    # A long idle period refills to capacity, no further
+    clock[0] += 3600
+    assert acquire(buckets, "a") == 0
+    assert acquire(buckets, "a") == 0
+    assert acquire(buckets, "a") > 0
+
+
+def test_least_recently_used_bucket_is_evicted(clock):
+    buckets = MemoryTokenBuckets(max_entries=2)
+    for key in ("a", "a", "b", "b"):
+        assert acquire(buckets, key) == 0
+    # Touching "a" makes "b" the least recently used, so "c" evicts it
+    assert acquire(buckets, "a") > 0
+    assert acquire(buckets, "c") == 0
+    assert list(buckets._buckets) == ["a", "c"]
+    # An evicted bucket starts full again
+    assert acquire(buckets, "b") == 0
+
+
+def test_429_retry_after_rounds_up_to_whole_seconds(clock):
+    middleware = limiter()
+    assert request(middleware)[0] == 200
+    assert request(middleware)[0] == 200
+    status, headers = request(middleware)
+    assert (status, headers["retry-after"]) == (429, "4")
+    clock[0] += 2.5
+    status, headers = request(middleware)
+    assert (status, headers["retry-after"]) == (429, "2")
+    # Never below one second, even when the token is a moment away
+    clock[0] += 1.4
+    assert request(middleware)[1]["retry-after"] == "1"
+    # Clients and unlisted routes are counted separately
+    assert request(middleware, client=("10.0.0.2", 1234))[0] == 200
+    assert request(middleware, method="GET")[0] == 200
+
+
+@pytest.mark.parametrize(
+    "trusted_proxies, forwarded, expected",
+    [
+        # No proxies trusted: X-Forwarded-For is whatever the client sent
+        (0, ["6.6.6.6"], "10.0.0.1"),
+        # The entry the trusted proxy appended, not the ones the client sent before it
+        (1, ["6.6.6.6, 1.2.3.4"], "1.2.3.4"),
+        (2, ["6.6.6.6, 1.2.3.4, 172.16.0.1"], "1.2.3.4"),
+        # Entries from repeated headers are read in order
+        (2, ["6.6.6.6, 1.2.3.4", "172.16.0.1"], "1.2.3.4"),
+        # Fewer entries than proxies: the header was not set by them, use the connection
+        (2, ["1.2.3.4"], "10.0.0.1"),
+        (1, [], "10.0.0.1"),
+    ],
+)
+def test_client_ip_behind_trusted_proxies(trusted_proxies, forwarded, expected):
+    scope = {"headers": [(b"x-forwarded-for", value.encode()) for value in forwarded], "client": ("10.0.0.1", 1234)}
+    assert limiter(trusted_proxies=trusted_proxies).client_ip(scope) == expected
+
+
+def test_spoofed_forwarded_for_does_not_get_a_new_bucket(clock):
+    middleware = limiter(trusted_proxies=1)
+    statuses = [request(middleware, forwarded=[f"6.6.6.{i}, 1.2.3.4"])[0] for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+class FailingCollection:
+    def __init__(self, hang: bool = False):
+        self.hang = hang
+        self.calls = 0
+
+    async def find_one_and_update(self, *args, **kwargs):
+        from pymongo.errors import ServerSelectionTimeoutError
+
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(10)
+        raise ServerSelectionTimeoutError("mongo:27017: connection refused")
+
+
+@pytest.mark.parametrize("hang", [False, True], ids=["error", "timeout"])
+def test_unavailable_bucket_store_lets_requests_through(hang, caplog):
+    collection = FailingCollection(hang=hang)
+    middleware = limiter(MongoTokenBuckets(collection), store_timeout=0.05)
+    assert [request(middleware)[0] for _ in range(3)] == [200, 200, 200]
+    assert collection.calls == 3
+    assert "letting the request through" in caplog.text
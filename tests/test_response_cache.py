@@ -0,0 +1,149 @@
+"""
+ResponseCache: ETag revalidation, TTL expiry, LRU eviction, prefix invalidation, and
+not caching a response that was being built while invalidate() ran.
+"""
+
+import asyncio
+import gzip
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import response_cache  # noqa: E402
+from compression import ResponseCompressor  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic for entry expiry"""
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_request(path: str, query: str = "", headers=()) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    })
+
+
+class Builder:
+    """A build() for ResponseCache.respond that counts its calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"version": self.calls}
+
+
+def respond(cache: ResponseCache, build, path: str = "/api/status", query: str = "", headers=()):
+    return asyncio.run(cache.respond(make_request(path, query, headers), build))
+
+
+def test_hit_is_served_without_building_and_revalidates_with_etag(clock):
+    cache, build = ResponseCache(), Builder()
+    first = respond(cache, build, query="limit=10&after=x")
+    # Same query in another order is the same entry
+    second = respond(cache, build, query="after=x&limit=10")
+    assert build.calls == 1
+    assert first.body == second.body == b'{"version":1}'
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    etag = first.headers["etag"]
+    revalidated = respond(cache, build, query="limit=10&after=x", headers=[("If-None-Match", f'"other", {etag}')])
+    assert (revalidated.status_code, revalidated.body, revalidated.headers["etag"]) == (304, b"", etag)
+    changed = respond(cache, build, query="limit=10&after=x", headers=[("If-None-Match", '"other"')])
+    assert changed.status_code == 200
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_compressed_variant_has_its_own_etag():
+    cache = ResponseCache(compressor=ResponseCompressor(minimum_size=1))
+    build = Builder()
+    plain = respond(cache, build)
+    gzipped = respond(cache, build, headers=[("Accept-Encoding", "gzip")])
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gzipped.body) == plain.body
+    assert gzipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    revalidated = respond(
+        cache, build, headers=[("Accept-Encoding", "gzip"), ("If-None-Match", gzipped.headers["etag"])]
+    )
+    assert revalidated.status_code == 304
+    assert (build.calls, cache.compressions) == (1, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache, build = ResponseCache(ttl_seconds=5), Builder()
+    respond(cache, build)
+    clock[0] += 4.9
+    respond(cache, build)
+    assert build.calls == 1
+    clock[0] += 0.1
+    assert respond(cache, build).body == b'{"version":2}'
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, build = ResponseCache(max_entries=2), Builder()
+    respond(cache, build, query="page=1")
+    respond(cache, build, query="page=2")
+    # Reading page 1 makes page 2 the least recently used
+    respond(cache, build, query="page=1")
+    respond(cache, build, query="page=3")
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("/api/status?page=1") is not None
+    assert cache.get("/api/status?page=2") is None
+    assert cache.get("/api/status?page=3") is not None
+
+
+def test_invalidate_drops_entries_under_a_prefix():
+    cache, build = ResponseCache(), Builder()
+    respond(cache, build, path="/api/status")
+    respond(cache, build, path="/api/status/rollups", query="granularity=minute")
+    respond(cache, build, path="/api/metrics")
+    cache.invalidate("/api/status")
+    assert cache.get("/api/status?") is None
+    assert cache.get("/api/status/rollups?granularity=minute") is None
+    assert cache.get("/api/metrics?") is not None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_response_built_across_an_invalidation_is_not_cached():
+    cache = ResponseCache()
+
+    async def scenario():
+        building, written = asyncio.Event(), asyncio.Event()
+
+        async def slow_build():
+            # Reads the database, then a write and its invalidate() land before it returns
+            building.set()
+            await written.wait()
+            return {"version": "before the write"}
+
+        async def write():
+            await building.wait()
+            cache.invalidate("/api/status")
+            written.set()
+
+        stale, _ = await asyncio.gather(cache.respond(make_request("/api/status"), slow_build), write())
+        fresh = await cache.respond(make_request("/api/status"), Builder())
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+    # The overlapping request still gets its response, but the next one rebuilds
+    assert stale.body == b'{"version":"before the write"}'
+    assert fresh.body == b'{"version":1}'
+    assert cache.stats()["stale_builds"] == 1
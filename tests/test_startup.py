@@ -0,0 +1,87 @@
+"""
+Services startup: an unreachable Mongo is retried in the background, while errors
+retrying cannot fix (bad settings, failed commands) fail startup.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError  # noqa: E402
+
+import server  # noqa: E402
+from settings import Settings  # noqa: E402
+
+
+def make_services(tmp_path) -> server.Services:
+    settings = Settings(
+        mongo_url="mongodb://localhost",
+        db_name="test",
+        resend_api_key="test",
+        mongo_startup_retry_seconds=0.01,
+        status_archive_dir=str(tmp_path),
+    )
+    return server.Services(settings, mongomock_motor.AsyncMongoMockClient())
+
+
+def fail_warm_up(services: server.Services, errors):
+    """Make warm_up_mongo raise each of errors in turn, then succeed"""
+    warm_up_mongo = services.warm_up_mongo
+
+    async def warm_up():
+        if errors:
+            raise errors.pop(0)
+        await warm_up_mongo()
+
+    services.warm_up_mongo = warm_up
+
+
+def test_unreachable_mongo_is_retried_until_startup_completes(tmp_path):
+    async def scenario():
+        services = make_services(tmp_path)
+        fail_warm_up(services, [ServerSelectionTimeoutError("no servers"), asyncio.TimeoutError()])
+        await services.startup()
+        ready_at_first = services.ready
+        await asyncio.wait_for(services._startup_task, 5)
+        ready = services.ready
+        await services.shutdown()
+        return ready_at_first, ready
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_other_startup_errors_are_not_retried(tmp_path):
+    async def scenario():
+        services = make_services(tmp_path)
+        fail_warm_up(services, [OperationFailure("Authentication failed", code=18)])
+        with pytest.raises(OperationFailure):
+            await services.startup()
+        task, ready = services._startup_task, services.ready
+        await services.shutdown()
+        return task, ready
+
+    assert asyncio.run(scenario()) == (None, False)
+
+
+def test_retrying_stops_at_an_error_retrying_cannot_fix(tmp_path):
+    async def scenario():
+        services = make_services(tmp_path)
+        fail_warm_up(services, [ServerSelectionTimeoutError("no servers"), OperationFailure("Authentication failed")])
+        await services.startup()
+        await asyncio.wait_for(services._startup_task, 5)
+        ready = services.ready
+        await services.shutdown()
+        return ready
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_retention_below_minimum_fails_app_creation():
+    settings = Settings(mongo_url="mongodb://localhost", db_name="test", resend_api_key="test", status_retention_days=1)
+    with pytest.raises(ValueError, match="STATUS_RETENTION_DAYS"):
+        server.create_app(settings)
@@ -0,0 +1,109 @@
+"""
+StatusArchiver retention against an in-memory Mongo (mongomock-motor): status checks
+are only deleted once their day is archived, however large the backlog.
+"""
+
+import asyncio
+import sys
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from archive import LEGACY_TTL_INDEX, StatusArchiver  # noqa: E402
+
+NOW = datetime(2024, 6, 11, 12, 0)
+RETENTION_DAYS = 3
+BACKLOG_DAYS = 10
+PER_DAY = 24
+
+
+def midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def status_checks_since(first_day: date, days: int):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "client_name": f"client_{i % 3}",
+            "timestamp": midnight(first_day + timedelta(days=d)) + timedelta(hours=i),
+        }
+        for d in range(days)
+        for i in range(PER_DAY)
+    ]
+
+
+class CheckedArchiver(StatusArchiver):
+    """Records, for every day deleted, whether its archive file was already in place"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expired = {}
+
+    async def expire_day(self, day: date) -> int:
+        self.expired[day] = self.path_for(day).exists()
+        return await super().expire_day(day)
+
+
+def test_backlog_past_retention_is_archived_before_it_is_deleted(tmp_path):
+    first_day = (NOW - timedelta(days=BACKLOG_DAYS)).date()
+    documents = status_checks_since(first_day, BACKLOG_DAYS + 1)
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.status_checks
+        await collection.insert_many([dict(document) for document in documents])
+        archiver = CheckedArchiver(collection, tmp_path, retention_days=RETENTION_DAYS)
+        archived = await archiver.archive_pending(NOW)
+        remaining = await collection.find({}, {"_id": 0}).to_list(None)
+        return archiver, archived, remaining
+
+    archiver, archived, remaining = asyncio.run(scenario())
+    cutoff = NOW - timedelta(days=RETENTION_DAYS)
+    expected_expired = [
+        first_day + timedelta(days=d) for d in range(BACKLOG_DAYS) if midnight(first_day + timedelta(days=d + 1)) <= cutoff
+    ]
+
+    # Every complete day was archived, and each expired day only after its file was written
+    assert len(archived) == BACKLOG_DAYS
+    assert sorted(archiver.expired) == expected_expired
+    assert all(archiver.expired.values())
+    for day in expected_expired:
+        by_id = {document["id"]: document for document in documents if document["timestamp"].date() == day}
+        assert {document["id"]: document for document in archiver.read_day(day)} == by_id
+
+    # Nothing of a day that has not fully passed the retention window was deleted
+    assert min(document["timestamp"] for document in remaining) == midnight(expected_expired[-1] + timedelta(days=1))
+    assert len(remaining) == len(documents) - len(expected_expired) * PER_DAY
+
+
+def test_failing_archival_deletes_nothing(tmp_path):
+    first_day = (NOW - timedelta(days=BACKLOG_DAYS)).date()
+    documents = status_checks_since(first_day, BACKLOG_DAYS)
+    # A file where the archive directory should be: every archive write fails
+    blocked = tmp_path / "archive"
+    blocked.write_text("")
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.status_checks
+        await collection.insert_many([dict(document) for document in documents])
+        archiver = StatusArchiver(collection, blocked, retention_days=RETENTION_DAYS)
+        with pytest.raises(OSError):
+            await archiver.archive_pending(NOW)
+        return await collection.count_documents({})
+
+    assert asyncio.run(scenario()) == len(documents)
+
+
+def test_legacy_ttl_index_is_dropped(tmp_path):
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().db.status_checks
+        await collection.create_index("timestamp", expireAfterSeconds=86400, name=LEGACY_TTL_INDEX)
+        await StatusArchiver(collection, tmp_path, retention_days=RETENTION_DAYS).ensure_indexes()
+        return await collection.index_information()
+
+    assert LEGACY_TTL_INDEX not in asyncio.run(scenario())
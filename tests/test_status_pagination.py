@@ -0,0 +1,112 @@
+"""
+Keyset pagination of GET /api/status against an in-memory Mongo (mongomock-motor):
+walking next_cursor visits every status check exactly once, in order, however many
+share a timestamp.
+"""
+
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+httpx = pytest.importorskip("httpx")
+
+import server  # noqa: E402
+from settings import Settings  # noqa: E402
+
+START = datetime(2024, 6, 11, 12, 0)
+TIMESTAMPS = 10
+# Status checks per timestamp; pages of PAGE_SIZE split ties across pages
+PER_TIMESTAMP = 3
+PAGE_SIZE = 4
+
+
+def status_checks():
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "client_name": f"client_{i % 2}",
+            "timestamp": START + timedelta(seconds=t),
+        }
+        for t in range(TIMESTAMPS)
+        for i in range(PER_TIMESTAMP)
+    ]
+
+
+def newest_first(documents):
+    return [document["id"] for document in sorted(documents, key=lambda d: (d["timestamp"], d["id"]), reverse=True)]
+
+
+async def walk(documents, **params):
+    """Insert documents, then follow next_cursor from the first page; returns the pages"""
+    settings = Settings(mongo_url="mongodb://localhost", db_name="test", resend_api_key="test")
+    app = server.create_app(settings, mongo_client=mongomock_motor.AsyncMongoMockClient())
+    await app.state.services.db.status_checks.insert_many([dict(document) for document in documents])
+    pages = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        params = {"limit": PAGE_SIZE, **params}
+        while True:
+            response = await client.get("/api/status", params=params)
+            assert response.status_code == 200, response.text
+            pages.append(response.json())
+            if pages[-1]["next_cursor"] is None:
+                return pages
+            params["after"] = pages[-1]["next_cursor"]
+
+
+@pytest.mark.parametrize(
+    "params, selected",
+    [
+        ({}, lambda d: True),
+        ({"client_name": "client_1"}, lambda d: d["client_name"] == "client_1"),
+        (
+            {"since": (START + timedelta(seconds=2)).isoformat(), "until": (START + timedelta(seconds=8)).isoformat()},
+            lambda d: START + timedelta(seconds=2) <= d["timestamp"] < START + timedelta(seconds=8),
+        ),
+    ],
+    ids=["all", "client", "time_range"],
+)
+def test_walking_pages_visits_every_status_check_once_in_order(params, selected):
+    documents = status_checks()
+    pages = asyncio.run(walk(documents, **params))
+    expected = newest_first([document for document in documents if selected(document)])
+
+    walked = [item["id"] for page in pages for item in page["items"]]
+    assert walked == expected
+    # Every page but the last is full; only the last has no next_cursor
+    assert [len(page["items"]) for page in pages[:-1]] == [PAGE_SIZE] * (len(pages) - 1)
+    assert 0 < len(pages[-1]["items"]) <= PAGE_SIZE
+    assert all(page["next_cursor"] for page in pages[:-1])
+
+
+def test_exactly_full_last_page_has_no_next_cursor():
+    documents = status_checks()[:PAGE_SIZE * 2]
+    pages = asyncio.run(walk(documents))
+    assert [len(page["items"]) for page in pages] == [PAGE_SIZE, PAGE_SIZE]
+    assert pages[-1]["next_cursor"] is None
+
+
+def test_cursor_round_trips_to_the_position_after_its_status_check():
+    status_check = {"id": "b", "timestamp": START}
+    keyset = server.decode_status_cursor(server.encode_status_cursor(status_check))
+    assert keyset == {
+        "timestamp": {"$lte": START},
+        "$or": [{"timestamp": {"$lt": START}}, {"timestamp": START, "id": {"$lt": "b"}}],
+    }
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm8tc2VwYXJhdG9y", "bm90LWEtZGF0ZXxpZA"])
+def test_invalid_cursor_is_rejected(cursor):
+    async def scenario():
+        settings = Settings(mongo_url="mongodb://localhost", db_name="test", resend_api_key="test")
+        app = server.create_app(settings, mongo_client=mongomock_motor.AsyncMongoMockClient())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/api/status", params={"after": cursor})
+
+    response = asyncio.run(scenario())
+    assert (response.status_code, response.json()["detail"]) == (400, "Invalid cursor")
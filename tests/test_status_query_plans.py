@@ -0,0 +1,129 @@
+"""
+Query plan regression tests for GET /api/status.
+
+Each test explains a status page query the endpoint can issue against a real MongoDB
+and fails if the winning plan scans the collection or sorts in memory, so an index
+or query change that loses the index shows up here rather than in production.
+
+Runs against MONGO_URL in a throwaway database. The tests are skipped when MONGO_URL
+is not set, and fail when it is set but no server answers, so an environment meant
+to run them cannot pass without doing so.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+pymongo = pytest.importorskip("pymongo")
+
+import server  # noqa: E402
+from settings import Settings  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGO_URL")
+CLIENTS = 20
+DOCUMENTS = 2000
+NOW = datetime(2024, 6, 1)
+
+
+@pytest.fixture(scope="module")
+def status_checks():
+    if not MONGO_URL:
+        pytest.skip("MONGO_URL is not set")
+    client = pymongo.MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError as e:
+        pytest.fail(f"MONGO_URL is set but MongoDB is not available at {MONGO_URL}: {e}")
+    db_name = f"test_query_plans_{uuid.uuid4().hex[:8]}"
+    collection = client[db_name].status_checks
+    collection.insert_many([
+        {"id": str(uuid.uuid4()), "client_name": f"client_{i % CLIENTS}", "timestamp": NOW - timedelta(minutes=i)}
+        for i in range(DOCUMENTS)
+    ])
+
+    # Indexes exactly as the app creates them at startup
+    async def ensure_indexes():
+        services = server.Services(Settings(mongo_url=MONGO_URL, db_name=db_name))
+        try:
+            await services.ensure_indexes()
+        finally:
+            await services.shutdown()
+    asyncio.run(ensure_indexes())
+
+    yield collection
+    client.drop_database(db_name)
+    client.close()
+
+
+def plan_stages(plan):
+    """(stage, indexName) of every stage in a plan, classic or slot-based"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"], plan.get("indexName")
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+def winning_plan(collection, query):
+    cursor = collection.find(query, server.STATUS_PROJECTION).sort(server.STATUS_SORT).limit(server.STATUS_PAGE_DEFAULT_LIMIT + 1)
+    return list(plan_stages(cursor.explain()["queryPlanner"]["winningPlan"]))
+
+
+def assert_index_scan(stages, index_name):
+    names = [stage for stage, _ in stages]
+    assert "COLLSCAN" not in names, stages
+    # The index order is the page order, so there must be no blocking sort
+    assert "SORT" not in names, stages
+    assert ("IXSCAN", index_name) in stages, stages
+
+
+def first_page_cursor(collection, query):
+    last = list(collection.find(query).sort(server.STATUS_SORT).limit(server.STATUS_PAGE_DEFAULT_LIMIT))[-1]
+    return server.encode_status_cursor(last)
+
+
+def test_unfiltered_page_uses_timestamp_index(status_checks):
+    assert_index_scan(winning_plan(status_checks, server.status_query()), "timestamp_id_desc")
+
+
+def test_time_range_uses_timestamp_index(status_checks):
+    query = server.status_query(since=NOW - timedelta(days=1), until=NOW)
+    assert_index_scan(winning_plan(status_checks, query), "timestamp_id_desc")
+
+
+def test_client_filter_uses_compound_index(status_checks):
+    query = server.status_query(client_name="client_3")
+    assert_index_scan(winning_plan(status_checks, query), "client_timestamp_id_desc")
+
+
+def test_client_and_time_range_uses_compound_index(status_checks):
+    query = server.status_query(client_name="client_3", since=NOW - timedelta(days=1), until=NOW)
+    assert_index_scan(winning_plan(status_checks, query), "client_timestamp_id_desc")
+
+
+def test_next_page_uses_timestamp_index(status_checks):
+    after = first_page_cursor(status_checks, {})
+    assert_index_scan(winning_plan(status_checks, server.status_query(after=after)), "timestamp_id_desc")
+
+
+def test_next_client_page_uses_compound_index(status_checks):
+    after = first_page_cursor(status_checks, {"client_name": "client_3"})
+    query = server.status_query(client_name="client_3", after=after)
+    assert_index_scan(winning_plan(status_checks, query), "client_timestamp_id_desc")
+
+
+def test_next_page_in_time_range_uses_timestamp_index(status_checks):
+    since, until = NOW - timedelta(days=1), NOW
+    after = first_page_cursor(status_checks, server.status_query(since=since, until=until))
+    query = server.status_query(since=since, until=until, after=after)
+    assert query["timestamp"] == {"$gte": since, "$lt": until, "$lte": query["timestamp"]["$lte"]}
+    assert_index_scan(winning_plan(status_checks, query), "timestamp_id_desc")
@@ -0,0 +1,100 @@
+"""
+WriteBehindBuffer against an in-memory Mongo (mongomock-motor): every accepted status
+check is written by the time stop() returns, a full buffer pushes back, and a batch
+that fails as a whole is retried.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from tests.test_outbox import FlakyCollection  # noqa: E402
+from write_buffer import WriteBehindBuffer, WriteBufferFull  # noqa: E402
+
+
+def status_check(n: int):
+    return {"id": str(n), "client_name": "client"}
+
+
+def new_collection():
+    return mongomock_motor.AsyncMongoMockClient().db.status_checks
+
+
+def test_stop_writes_everything_accepted():
+    flushed = []
+
+    async def on_flush(documents):
+        flushed.extend(documents)
+
+    async def scenario():
+        collection = new_collection()
+        # Neither a full batch nor a due interval: only stop() makes these go out
+        buffer = WriteBehindBuffer(collection, max_items=1000, flush_interval=60, on_flush=on_flush)
+        buffer.start()
+        for n in range(250):
+            await buffer.add(status_check(n))
+        await buffer.stop()
+        return await collection.count_documents({}), buffer.stats()
+
+    count, stats = asyncio.run(scenario())
+    assert count == 250 and len(flushed) == 250
+    assert stats["pending"] == 0 and stats["written"] == 250
+
+
+def test_documents_are_refused_unless_running():
+    async def scenario():
+        buffer = WriteBehindBuffer(new_collection())
+        with pytest.raises(WriteBufferFull, match="not running"):
+            await buffer.add(status_check(0))
+        buffer.start()
+        await buffer.add(status_check(1))
+        await buffer.stop()
+        with pytest.raises(WriteBufferFull, match="shutting down"):
+            await buffer.add(status_check(2))
+        return buffer.stats()
+
+    assert asyncio.run(scenario())["written"] == 1
+
+
+def test_full_buffer_pushes_back():
+    async def scenario():
+        # The first insert fails and is retried after a backoff longer than full_timeout
+        collection = FlakyCollection(new_collection(), "insert_many")
+        buffer = WriteBehindBuffer(
+            collection, max_items=5, flush_interval=0, max_pending=5, full_timeout=0.05, retry_backoff_seconds=0.3
+        )
+        buffer.start()
+        for n in range(5):
+            await buffer.add(status_check(n))
+        await asyncio.sleep(0.01)
+        with pytest.raises(WriteBufferFull, match="already pending"):
+            await buffer.add(status_check(5))
+        pending = buffer.stats()["pending"]
+        await buffer.stop()
+        return pending, await collection.count_documents({})
+
+    # Refused while full; what was accepted is still written once the database recovers
+    assert asyncio.run(scenario()) == (5, 5)
+
+
+def test_failed_batch_is_retried():
+    async def scenario():
+        collection = FlakyCollection(new_collection(), "insert_many", failures=2)
+        buffer = WriteBehindBuffer(collection, max_items=10, flush_interval=0.01, retry_backoff_seconds=0.01)
+        buffer.start()
+        for n in range(20):
+            await buffer.add(status_check(n))
+        await buffer.stop()
+        documents = await collection.find({}, {"_id": 0, "id": 1}).to_list(None)
+        return collection.failures, sorted(int(document["id"]) for document in documents), buffer.stats()
+
+    failures_left, ids, stats = asyncio.run(scenario())
+    assert failures_left == 0
+    # Written exactly once each, despite two failed attempts
+    assert ids == list(range(20))
+    assert stats["written"] == 20 and stats["failed"] == 0